@@ -1,8 +1,29 @@
 import subprocess
 import psutil
 import socket
+import sys
+import json
+import time
 import re
 
+try:
+    from orjson import loads as _json_loads  # optional: native JSON decoder
+except ImportError:
+    _json_loads = json.loads  # also takes bytes
+
+# Compiled once at import; used when 'ip -j' is unavailable.
+# One alternation so 'ip addr show' output is scanned in a single pass:
+# the UP link flag (or 'state UP') and every 'inet a.b.c.d/nn' line.
+_STATE_RE = re.compile(
+    r'(?P<up>[<,]UP[,>]|state UP)'
+    r'|inet (?P<ip>\d+\.\d+\.\d+\.\d+)/(?P<pfx>\d+)'
+)
+
+# How long (seconds) one 'ip -j addr show' snapshot is reused
+IP_SNAPSHOT_TTL = 1.0
+# How long (seconds) psutil address/stats snapshots are reused
+PSUTIL_SNAPSHOT_TTL = 0.5
+
 class NetworkManager:
     """
     Handles network interface operations:
@@ -13,12 +34,49 @@ class NetworkManager:
     """
 
     def __init__(self):
-        pass
+        # (timestamp, {ifname: entry}) from the last 'ip -j addr show'
+        self._ip_cache = None
+        # (timestamp, dict) from psutil.net_if_addrs() / net_if_stats()
+        self._addr_cache = None
+        self._stat_cache = None
+        # (addrs, stats, interfaces): get_interfaces() result built from
+        # those two psutil snapshots, reused while they are still current
+        self._iface_cache = None
+
+    def _addrs(self):
+        """psutil.net_if_addrs(), reused for PSUTIL_SNAPSHOT_TTL seconds."""
+        now = time.monotonic()
+        if self._addr_cache is None or now - self._addr_cache[0] >= PSUTIL_SNAPSHOT_TTL:
+            self._addr_cache = (now, psutil.net_if_addrs())
+        return self._addr_cache[1]
 
+    def _stats(self):
+        """psutil.net_if_stats(), reused for PSUTIL_SNAPSHOT_TTL seconds."""
+        now = time.monotonic()
+        if self._stat_cache is None or now - self._stat_cache[0] >= PSUTIL_SNAPSHOT_TTL:
+            self._stat_cache = (now, psutil.net_if_stats())
+        return self._stat_cache[1]
+
+    def _exists(self, iface):
+        """
+        True if iface is a known interface.
+
+        Checks the (cached) net_if_stats() map: one entry per interface,
+        much cheaper to build than net_if_addrs() with every address.
+        """
+        return iface in self._stats()
 
-    def run_command(self, command):
+    def _invalidate(self):
+        """Drop cached snapshots after changing interface state."""
+        self._ip_cache = None
+        self._addr_cache = None
+        self._stat_cache = None
+        self._iface_cache = None
+
+    def run_command(self, argv):
+        """Run argv (a list, executed without a shell) and describe the outcome."""
         try:
-            result = subprocess.run(command, shell=True, capture_output=True, text=True)
+            result = subprocess.run(argv, capture_output=True, text=True)
 
             if result.returncode == 0:
                     return "Command executed successfully!"
@@ -30,6 +88,77 @@ class NetworkManager:
         except Exception as e:
                 return f"Exception: {str(e)}"
 
+    async def run_command_async(self, *argv):
+        """
+        Non-blocking run_command: exec argv directly (no shell) so several
+        commands can be awaited together with asyncio.gather.
+        """
+        import asyncio  # only the concurrent path needs the event loop
+
+        try:
+            proc = await asyncio.create_subprocess_exec(
+                *argv,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE
+            )
+            _, stderr = await proc.communicate()
+
+            if proc.returncode == 0:
+                return "Command executed successfully!"
+            else:
+                # Return the actual error message
+                error_msg = stderr.decode().strip() or "Unknown error."
+                return f"Command failed: {error_msg}"
+
+        except Exception as e:
+            return f"Exception: {str(e)}"
+
+    def _snapshot_ip_addr(self):
+        """
+        Return {ifname: entry} parsed from one 'ip -j addr show' call.
+
+        The result is reused for IP_SNAPSHOT_TTL seconds so that sweeping
+        every interface costs a single fork instead of one per interface.
+        Returns None if this iproute2 build has no JSON output.
+        """
+        now = time.monotonic()
+        if self._ip_cache is not None and now - self._ip_cache[0] < IP_SNAPSHOT_TTL:
+            return self._ip_cache[1]
+
+        try:
+            # Raw bytes straight into the decoder: no str decode pass
+            result = subprocess.run(
+                ['ip', '-j', 'addr', 'show'],
+                capture_output=True,
+                check=True
+            )
+            data = {entry['ifname']: entry for entry in _json_loads(result.stdout)}
+        except (subprocess.CalledProcessError, ValueError, KeyError, OSError):
+            return None
+
+        self._ip_cache = (now, data)
+        return data
+
+    def _parse_ip_addr_text(self, interface, state):
+        """Fill state from the plain 'ip addr show <iface>' output."""
+        result = subprocess.run(
+            ['ip', 'addr', 'show', interface],
+            capture_output=True,
+            text=True,
+            check=True
+        )
+
+        for m in _STATE_RE.finditer(result.stdout):
+            if m.group('up'):
+                # Header looks like: 2: eth0: <BROADCAST,MULTICAST,UP,LOWER_UP> ...
+                state['enabled'] = True
+            elif m.group('ip') != '127.0.0.1':  # Skip localhost
+                # Look for lines like: inet 192.168.1.100/24
+                state['addresses'].append({
+                    'ip': m.group('ip'),
+                    'netmask': m.group('pfx')
+                })
+
     def get_interface_state(self, interface):
         """
         Get current state of a network interface.
@@ -49,32 +178,27 @@ class NetworkManager:
             'type': 'unknown'
         }
 
-        try:
-            # Get interface details using 'ip addr show'
-            result = subprocess.run(
-                ['ip', 'addr', 'show', interface],
-                capture_output=True,
-                text=True,
-                check=True
-            )
+        snapshot = self._snapshot_ip_addr()
 
-            output = result.stdout
-
-            # Check if interface is UP
-            if 'state UP' in output or 'UP' in output.split('\n')[0]:
-                state['enabled'] = True
+        try:
+            if snapshot is not None:
+                link = snapshot.get(interface)
+                if link is None:
+                    print(f"⚠️  Could not get state for {interface}: no such interface")
+                    return state
 
-            # Extract IP addresses
-            # Look for lines like: inet 192.168.1.100/24
-            ip_pattern = r'inet (\d+\.\d+\.\d+\.\d+)/(\d+)'
-            matches = re.findall(ip_pattern, output)
+                if link.get('operstate') == 'UP' or 'UP' in link.get('flags', []):
+                    state['enabled'] = True
 
-            for ip, netmask in matches:
-                if ip != '127.0.0.1':  # Skip localhost
-                    state['addresses'].append({
-                        'ip': ip,
-                        'netmask': netmask
-                    })
+                for addr in link.get('addr_info', []):
+                    if addr.get('family') == 'inet' and addr.get('local') != '127.0.0.1':
+                        state['addresses'].append({
+                            'ip': addr['local'],
+                            'netmask': str(addr['prefixlen'])
+                        })
+            else:
+                # iproute2 without JSON support: parse the text output
+                self._parse_ip_addr_text(interface, state)
 
             # Simple heuristic: if it has an IP, assume it's configured
             # (Real detection would need to check DHCP lease files or netplan config)
@@ -95,54 +219,104 @@ class NetworkManager:
         - MAC address
         - IPv4 / IPv6 addresses
         - UP/DOWN status
+
+        The result is shared until the psutil snapshots are refreshed
+        (TTL or enable/disable), so callers must not modify it.
         """
+        # psutil.net_if_addrs() gives IPs + MAC (cached, see _addrs)
+        addr = self._addrs()
+        stat = self._stats()
+        cached = self._iface_cache
+        if cached is not None and cached[0] is addr and cached[1] is stat:
+            return cached[2]
+
         interfaces = {}
 
-        # psutil.net_if_addrs() gives IPs + MAC
-        addr = psutil.net_if_addrs()
-        stat = psutil.net_if_stats()
+        # Bound once: locals are cheaper than module attribute lookups
+        # in the per-address loop, and the dict replaces an elif chain.
+        AF_LINK = psutil.AF_LINK
+        ip_keys = {socket.AF_INET: "ipv4", socket.AF_INET6: "ipv6"}
+
         for iface, address_list in addr.items():
-            interfaces[iface] = {
+            data = interfaces[iface] = {
                 "mac": "N/A",
                 "ipv4": [],
                 "ipv6": [],
                 "status": "Down"
             }
             for address in address_list:
-                if address.family == psutil.AF_LINK:
-                    interfaces[iface]["mac"] = address.address
-                elif address.family == socket.AF_INET:
-                    interfaces[iface]["ipv4"].append(
-                        f"{address.address}/{address.netmask}"
-                    )
-                elif address.family == socket.AF_INET6:
-                    interfaces[iface]["ipv6"].append(
-                        f"{address.address}/{address.netmask}"
-                    )
+                family = address.family
+                if family == AF_LINK:
+                    data["mac"] = address.address
+                else:
+                    key = ip_keys.get(family)
+                    if key:
+                        data[key].append(f"{address.address}/{address.netmask}")
             if iface in stat:
-                interfaces[iface]["status"] = "UP" if stat[iface].isup else "DOWN"
+                data["status"] = "UP" if stat[iface].isup else "DOWN"
+
+        self._iface_cache = (addr, stat, interfaces)
         return interfaces
 
     def enable(self, iface):
-        if iface not in psutil.net_if_addrs():
+        if not self._exists(iface):
             return f"Error: interface '{iface}' does not exist."
 
-        return self.run_command(f"sudo ip link set dev {iface} up")
+        result = self.run_command(['sudo', 'ip', 'link', 'set', 'dev', iface, 'up'])
+        self._invalidate()
+        return result
 
     def disable(self, iface):
-        if iface not in psutil.net_if_addrs():
+        if not self._exists(iface):
+            return f"Error: interface '{iface}' does not exist."
+        result = self.run_command(['sudo', 'ip', 'link', 'set', 'dev', iface, 'down'])
+        self._invalidate()
+        return result
+
+    async def enable_async(self, iface):
+        if not self._exists(iface):
             return f"Error: interface '{iface}' does not exist."
-        return self.run_command(f"sudo ip link set dev {iface} down")
+        result = await self.run_command_async('sudo', 'ip', 'link', 'set', 'dev', iface, 'up')
+        self._invalidate()
+        return result
+
+    async def disable_async(self, iface):
+        if not self._exists(iface):
+            return f"Error: interface '{iface}' does not exist."
+        result = await self.run_command_async('sudo', 'ip', 'link', 'set', 'dev', iface, 'down')
+        self._invalidate()
+        return result
+
+    def set_many(self, ifaces, up=True):
+        """
+        Enable (up=True) or disable several interfaces concurrently.
+
+        Returns:
+            dict: {iface: result message}
+        """
+        import asyncio
+
+        toggle = self.enable_async if up else self.disable_async
+
+        async def _run():
+            return await asyncio.gather(*[toggle(iface) for iface in ifaces])
+
+        return dict(zip(ifaces, asyncio.run(_run())))
 
     def get_interface_names(self):
-        return list(psutil.net_if_addrs().keys())
+        return list(self._addrs().keys())
 
     def show_interfaces(self):
         interfaces = self.get_interfaces()
+        # Build the whole report and write it once
+        out = []
         for iface, data in interfaces.items():
-            print(f"\nInterface: {iface}")
-            print(f"  Status : {data['status']}")
-            print(f"  MAC    : {data['mac']}")
-            print(f"  IPv4   : {', '.join(data['ipv4']) if data['ipv4'] else 'None'}")
-            print(f"  IPv6   : {', '.join(data['ipv6']) if data['ipv6'] else 'None'}")
+            out.append(
+                f"\nInterface: {iface}\n"
+                f"  Status : {data['status']}\n"
+                f"  MAC    : {data['mac']}\n"
+                f"  IPv4   : {', '.join(data['ipv4']) or 'None'}\n"
+                f"  IPv6   : {', '.join(data['ipv6']) or 'None'}\n"
+            )
+        sys.stdout.write(''.join(out))
 
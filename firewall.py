@@ -1,5 +1,13 @@
+import sys
+
 import iptc
 
+# Accepted rule fields (normalised case)
+_VALID_CHAINS = frozenset({'INPUT', 'OUTPUT', 'FORWARD'})
+_VALID_PROTOCOLS = frozenset({'tcp', 'udp', 'icmp'})
+_PORT_PROTOCOLS = frozenset({'tcp', 'udp'})
+_VALID_ACTIONS = frozenset({'ACCEPT', 'DROP', 'REJECT'})
+
 class SimpleFirewall:
 
     def __init__(self, table_name='filter'):
@@ -13,52 +21,97 @@ class SimpleFirewall:
         else:
             raise ValueError("Unsupported table name. Use 'filter', 'nat', or 'mangle'.")
 
-    def add_rule(self, chain_name, protocol, destination_port, action):
+    def _build_rule(self, cn, pr, destination_port, act):
         """
-        Adds a rule to the specified chain.
-        chain_name: 'INPUT', 'OUTPUT', or 'FORWARD'
-        protocol: 'tcp', 'udp', or 'icmp'
-        destination_port: integer (required for tcp/udp)
-        action: 'ACCEPT', 'DROP', 'REJECT'
+        Validate a rule specification and build the matching iptc.Rule.
+        Expects an upper-cased chain/action and a lower-cased protocol.
+        Returns None (after printing why) if the specification is invalid.
         """
         # Basic validation
-        if chain_name.upper() not in ['INPUT', 'OUTPUT', 'FORWARD']:
+        if cn not in _VALID_CHAINS:
             print("Invalid chain name. Must be INPUT, OUTPUT, or FORWARD.")
-            return
-        if protocol.lower() not in ['tcp', 'udp', 'icmp']:
+            return None
+        if pr not in _VALID_PROTOCOLS:
             print("Invalid protocol. Must be tcp, udp, or icmp.")
-            return
-        if protocol.lower() in ['tcp', 'udp'] and not destination_port:
+            return None
+        if pr in _PORT_PROTOCOLS and not destination_port:
             print("Destination port is required for TCP/UDP.")
-            return
-        if action.upper() not in ['ACCEPT', 'DROP', 'REJECT']:
+            return None
+        if act not in _VALID_ACTIONS:
             print("Invalid action. Must be ACCEPT, DROP, or REJECT.")
-            return
+            return None
 
-        chain = iptc.Chain(self.table, chain_name.upper())
         rule = iptc.Rule()
-        rule.protocol = protocol.lower()
+        rule.protocol = pr
 
-        if protocol.lower() in ['tcp', 'udp']:
-            match = iptc.Match(rule, protocol.lower())
+        if pr in _PORT_PROTOCOLS:
+            match = iptc.Match(rule, pr)
             match.dport = str(destination_port)
             rule.add_match(match)
 
-        rule.target = iptc.Target(rule, action.upper())
+        rule.target = iptc.Target(rule, act)
+        return rule
+
+    def add_rule(self, chain_name, protocol, destination_port, action):
+        """
+        Adds a rule to the specified chain.
+        chain_name: 'INPUT', 'OUTPUT', or 'FORWARD'
+        protocol: 'tcp', 'udp', or 'icmp'
+        destination_port: integer (required for tcp/udp)
+        action: 'ACCEPT', 'DROP', 'REJECT'
+        """
+        cn, pr, act = chain_name.upper(), protocol.lower(), action.upper()
+        rule = self._build_rule(cn, pr, destination_port, act)
+        if rule is None:
+            return
+
+        chain = iptc.Chain(self.table, cn)
         chain.append_rule(rule)
-        print(f"Rule added: -A {chain_name.upper()} -p {protocol.lower()} --dport {destination_port} -j {action.upper()}")
+        print(f"Rule added: -A {cn} -p {pr} --dport {destination_port} -j {act}")
+
+    def add_rules(self, specs):
+        """
+        Add several rules in a single table commit.
+        specs: iterable of (chain_name, protocol, destination_port, action)
+        Invalid specifications are reported and skipped.
+        """
+        built = []
+        for chain_name, protocol, destination_port, action in specs:
+            spec = (chain_name.upper(), protocol.lower(), destination_port, action.upper())
+            rule = self._build_rule(*spec)
+            if rule is not None:
+                built.append((spec, rule))
+        if not built:
+            return
+
+        # One kernel update for the whole batch instead of one per rule
+        self.table.autocommit = False
+        try:
+            for (cn, _, _, _), rule in built:
+                iptc.Chain(self.table, cn).append_rule(rule)
+            self.table.commit()
+        finally:
+            self.table.autocommit = True
+            self.table.refresh()
+
+        for (cn, pr, destination_port, act), _ in built:
+            print(f"Rule added: -A {cn} -p {pr} --dport {destination_port} -j {act}")
 
     def remove_rule_by_spec(self, chain_name, protocol, destination_port, action):
         """
         Remove a rule based on its specification.
         """
-        chain = iptc.Chain(self.table, chain_name.upper())
+        cn, pr, act = chain_name.upper(), protocol.lower(), action.upper()
+        dport_s = str(destination_port)
+
+        # chain.rules rebuilds the rule list on every access; read it once
+        chain = iptc.Chain(self.table, cn)
         for rule in chain.rules:
-            if rule.protocol == protocol.lower() and rule.target.name == action.upper():
+            if rule.protocol == pr and rule.target.name == act:
                 for match in rule.matches:
-                    if hasattr(match, "dport") and match.dport == str(destination_port):
+                    if getattr(match, "dport", None) == dport_s:
                         chain.delete_rule(rule)
-                        print(f"Rule removed: -D {chain_name.upper()} -p {protocol.lower()} --dport {destination_port} -j {action.upper()}")
+                        print(f"Rule removed: -D {cn} -p {pr} --dport {destination_port} -j {act}")
                         return
         print("Rule not found.")
 
@@ -66,23 +119,26 @@ class SimpleFirewall:
         """
         Remove a rule by its position in the chain (1-indexed).
         """
-        chain = iptc.Chain(self.table, chain_name.upper())
+        cn = chain_name.upper()
+        chain = iptc.Chain(self.table, cn)
         try:
             chain.delete_rule(chain.rules[rule_number - 1])
-            print(f"Rule at position {rule_number} removed from {chain_name.upper()} chain.")
+            print(f"Rule at position {rule_number} removed from {cn} chain.")
         except IndexError:
-            print(f"Rule at position {rule_number} not found in {chain_name.upper()} chain.")
+            print(f"Rule at position {rule_number} not found in {cn} chain.")
 
     def list_rules(self, chain_name):
         """
         List all rules in the specified chain.
         """
-        chain = iptc.Chain(self.table, chain_name.upper())
-        if not chain.rules:
-            print(f"No rules in {chain_name.upper()} chain.")
+        cn = chain_name.upper()
+        rules = iptc.Chain(self.table, cn).rules
+        if not rules:
+            print(f"No rules in {cn} chain.")
             return
-        print(f"Rules in {chain_name.upper()} chain:")
-        for i, rule in enumerate(chain.rules, start=1):
+        # Build the whole listing and write it once
+        out = [f"Rules in {cn} chain:\n"]
+        for i, rule in enumerate(rules, start=1):
             proto = rule.protocol
             action = rule.target.name
             dport = None
@@ -90,26 +146,36 @@ class SimpleFirewall:
                 if hasattr(match, "dport"):
                     dport = match.dport
             if dport:
-                print(f"{i}. -p {proto} --dport {dport} -j {action}")
+                out.append(f"{i}. -p {proto} --dport {dport} -j {action}\n")
             else:
-                print(f"{i}. -p {proto} -j {action}")
+                out.append(f"{i}. -p {proto} -j {action}\n")
+        sys.stdout.write(''.join(out))
 
     def remove_all_rules(self, chain_name):
         """
         Remove all rules in the specified chain.
         """
-        if chain_name.upper() not in ['INPUT', 'OUTPUT', 'FORWARD']:
+        cn = chain_name.upper()
+        if cn not in _VALID_CHAINS:
             print("Invalid chain name. Must be INPUT, OUTPUT, or FORWARD.")
             return
 
-        chain = iptc.Chain(self.table, chain_name.upper())
-        if not chain.rules:
-            print(f"No rules to remove in {chain_name.upper()} chain.")
+        chain = iptc.Chain(self.table, cn)
+        rules = chain.rules
+        if not rules:
+            print(f"No rules to remove in {cn} chain.")
             return
 
-        for rule in chain.rules[:]:  
-            chain.delete_rule(rule)
-        print(f"All rules removed from {chain_name.upper()} chain.")
+        # One kernel update for the whole chain instead of one per rule
+        self.table.autocommit = False
+        try:
+            for rule in rules:
+                chain.delete_rule(rule)
+            self.table.commit()
+        finally:
+            self.table.autocommit = True
+            self.table.refresh()
+        print(f"All rules removed from {cn} chain.")
 
 
 # ## test 
@@ -1,11 +1,186 @@
 #!/usr/bin/env python3
 
+import copy
 import json
 import os
+import re
+import select
+import signal
+import socket
 import sys
 import subprocess
+import time
 from pathlib import Path
 
+try:
+    import readline  # line editing and history for input() prompts
+except ImportError:
+    pass
+
+import netplan_yaml
+
+# Kernel-exported directory with one entry per network interface
+SYS_CLASS_NET = '/sys/class/net'
+
+# Dotted-quad IPv4: accepts exactly what inet_pton(AF_INET) accepts
+# (0-255 per octet, no leading zeros, ASCII digits only)
+_OCTET = r'(?:25[0-5]|2[0-4][0-9]|1[0-9][0-9]|[1-9]?[0-9])'
+_IPV4_RE = re.compile(rf'(?:{_OCTET}\.){{3}}{_OCTET}')
+
+# Interface names in 'ip link show' output ("2: eth0: <...>", "3: veth1@if2: ...")
+_IP_LINK_RE = re.compile(rb'^\d+:\s+([^:@\s]+)', re.M)
+
+# Netplan's documented defaults for per-interface keys. A key holding its
+# default means the same as the key being absent, so strip_defaults()
+# drops it from saved snapshots.
+NETPLAN_DEFAULTS = {
+    'dhcp4': False,
+    'dhcp6': False,
+    'optional': False,
+    'critical': False,
+    'wakeonlan': False,
+    'addresses': [],
+    'routes': [],
+    'routing-policy': [],
+    'search': [],
+    'nameservers': {},
+}
+
+# Reused for the machine-read tracking JSON: no indentation whitespace,
+# and the config tree (dicts/lists/scalars) cannot contain cycles
+_COMPACT_JSON = json.JSONEncoder(separators=(',', ':'), check_circular=False)
+
+
+def _prompt(message, parse):
+    """
+    Ask until parse(answer) succeeds. parse returns the value to use or
+    raises ValueError carrying the message to show before asking again.
+    """
+    while True:
+        try:
+            return parse(input(message))
+        except ValueError as e:
+            print(e)
+
+
+def _drop_defaults(settings):
+    """Copy of settings without NETPLAN_DEFAULTS-valued keys (recursive)."""
+    out = {}
+    for key, value in settings.items():
+        if isinstance(value, dict):
+            value = _drop_defaults(value)
+        if key in NETPLAN_DEFAULTS and value == NETPLAN_DEFAULTS[key]:
+            continue
+        out[key] = value
+    return out
+
+
+def strip_defaults(config):
+    """
+    Copy of a netplan config with default-valued keys removed from each
+    network.ethernets entry (interfaces themselves are kept, even if
+    nothing is left). Netplan treats the result the same as config.
+    Returned as is if it doesn't have that shape (e.g. 'network:' empty).
+    """
+    network = config.get('network')
+    if not isinstance(network, dict) or not isinstance(network.get('ethernets'), dict):
+        return config
+
+    ethernets = network['ethernets']
+    network = dict(network)
+    network['ethernets'] = {
+        name: _drop_defaults(settings) if isinstance(settings, dict) else settings
+        for name, settings in ethernets.items()
+    }
+    return {**config, 'network': network}
+
+
+def atomic_write(path, text):
+    """
+    Replace path with text (str, or already-encoded bytes) atomically:
+    write a temp file in the same directory with one write + fsync, then
+    os.replace it over path (and fsync the directory), so a crash never
+    leaves a truncated file behind. The temp name ends in .tmp so netplan
+    never picks it up as a *.yaml file.
+    """
+    import tempfile
+
+    path = Path(path)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(text if isinstance(text, bytes) else text.encode('utf-8'))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+    # Make the rename itself durable: fsync the directory entry too
+    try:
+        dir_fd = os.open(path.parent, os.O_RDONLY | os.O_DIRECTORY)
+    except OSError:
+        return
+    try:
+        os.fsync(dir_fd)
+    except OSError:
+        pass
+    finally:
+        os.close(dir_fd)
+
+
+def run_quiet(argv, timeout):
+    """
+    Run argv with stdout discarded and return (returncode, stderr text).
+
+    Uses os.posix_spawnp (vfork+exec, no Popen pipe/thread plumbing) when
+    available, otherwise subprocess.run.
+    Raises subprocess.TimeoutExpired (after killing the child) on timeout.
+    """
+    if not hasattr(os, 'posix_spawnp'):
+        result = subprocess.run(argv, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                                text=True, timeout=timeout)
+        return result.returncode, result.stderr
+
+    r, w = os.pipe()
+    try:
+        pid = os.posix_spawnp(argv[0], argv, os.environ, file_actions=[
+            (os.POSIX_SPAWN_OPEN, 1, os.devnull, os.O_WRONLY, 0),
+            (os.POSIX_SPAWN_DUP2, w, 2),
+            (os.POSIX_SPAWN_CLOSE, r),
+            (os.POSIX_SPAWN_CLOSE, w),
+        ])
+    except BaseException:
+        os.close(r)
+        raise
+    finally:
+        os.close(w)
+
+    # Drain stderr until the child closes it, or until the deadline
+    chunks = []
+    deadline = time.monotonic() + timeout
+    try:
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not select.select([r], [], [], remaining)[0]:
+                os.kill(pid, signal.SIGKILL)
+                os.waitpid(pid, 0)
+                raise subprocess.TimeoutExpired(argv, timeout)
+            data = os.read(r, 65536)
+            if not data:
+                break
+            chunks.append(data)
+    finally:
+        os.close(r)
+
+    _, status = os.waitpid(pid, 0)
+    returncode = os.WEXITSTATUS(status) if os.WIFEXITED(status) else -os.WTERMSIG(status)
+    return returncode, b''.join(chunks).decode(errors='replace')
+
 
 class NetplanConfigurator:
     def __init__(self, config_path="/etc/network-tool"):
@@ -19,6 +194,10 @@ class NetplanConfigurator:
         # WHY: netplan apply reads from /etc/netplan/*.yaml files
         # We need to write to THIS file, not just save JSON
 
+        # ((mtime_ns, size), parsed config) of the last YAML load, so
+        # repeated configure_* calls don't re-parse an unchanged file
+        self._cfg_cache = None
+
     def check_root(self):
         """Ensure script is run with sudo"""
         if os.geteuid() != 0:
@@ -31,78 +210,108 @@ class NetplanConfigurator:
         This reads the actual netplan configuration that's currently active
         on the system, so we can see what's really configured.
         """
-        import yaml
+        try:
+            st = self.netplan_yaml_file.stat()
+        except OSError:
+            return {'network': {'version': 2, 'ethernets': {}}}
 
-        if self.netplan_yaml_file.exists():
-            try:
-                with open(self.netplan_yaml_file, 'r') as f:
-                    config = yaml.safe_load(f)
-
-                    # Ensure proper structure
-                    if config is None:
-                        config = {}
-                    if 'network' not in config:
-                        config['network'] = {}
-                    if 'version' not in config['network']:
-                        config['network']['version'] = 2
-                    if 'ethernets' not in config['network']:
-                        config['network']['ethernets'] = {}
-
-                    return config
-            except Exception as e:
-                print(f"⚠️ Warning: Could not load netplan YAML: {e}")
-                return {'network': {'version': 2, 'ethernets': {}}}
-
-        return {'network': {'version': 2, 'ethernets': {}}}
-
-    def save_config(self, config):
+        # Unchanged since the last parse: hand out a copy (callers mutate it)
+        key = (st.st_mtime_ns, st.st_size)
+        if self._cfg_cache is not None and self._cfg_cache[0] == key:
+            return copy.deepcopy(self._cfg_cache[1])
+
+        try:
+            with open(self.netplan_yaml_file, 'r') as f:
+                config = netplan_yaml.load(f.read())
+
+                # Ensure proper structure
+                if config is None:
+                    config = {}
+                if 'network' not in config:
+                    config['network'] = {}
+                if 'version' not in config['network']:
+                    config['network']['version'] = 2
+                if 'ethernets' not in config['network']:
+                    config['network']['ethernets'] = {}
+
+                self._cfg_cache = (key, config)
+                return copy.deepcopy(config)
+        except Exception as e:
+            print(f"⚠️ Warning: Could not load netplan YAML: {e}")
+            return {'network': {'version': 2, 'ethernets': {}}}
+
+    def render_config(self, config):
+        """Netplan YAML text for config (render once, then display/save it)"""
+        return netplan_yaml.dump(config)
+
+    def save_config(self, config, pretty=False, yaml_text=None):
         """
         Save to BOTH places:
         1. Our JSON file (for persistence tracking)
         2. Real netplan YAML file (so netplan apply actually works)
-        """
-        import yaml
 
+        The JSON is written compactly unless pretty=True (indented, for
+        reading by hand). yaml_text is the output of render_config(config)
+        if the caller already has it.
+        """
         # Create our config directory if needed
         self.config_path.mkdir(parents=True, exist_ok=True)
 
         # 1. Save to our JSON file (for tracking)
         try:
-            with open(self.config_file, 'w') as f:
-                json.dump(config, f, indent=4)
+            if pretty:
+                atomic_write(self.config_file, json.dumps(config, indent=4))
+            else:
+                atomic_write(self.config_file, _COMPACT_JSON.encode(config))
             print(f"✓ Configuration saved to {self.config_file}")
         except Exception as e:
             print(f"⚠️ Warning: Could not save JSON: {e}")
 
         # 2. Save to REAL netplan YAML file
         try:
-            with open(self.netplan_yaml_file, 'w') as f:
-                yaml.dump(config, f, default_flow_style=False, sort_keys=False)
+            if yaml_text is None:
+                yaml_text = self.render_config(config)
+            atomic_write(self.netplan_yaml_file, yaml_text)
             print(f"✓ Netplan YAML written to {self.netplan_yaml_file}")
+
+            # We know what the file now holds: seed the load_config cache
+            # instead of re-parsing our own write on the next load
+            network = config.get('network')
+            if isinstance(network, dict) and 'version' in network and 'ethernets' in network:
+                st = self.netplan_yaml_file.stat()
+                self._cfg_cache = ((st.st_mtime_ns, st.st_size), copy.deepcopy(config))
+            else:
+                self._cfg_cache = None
         except Exception as e:
             print(f"⚠️ Error: Could not write netplan YAML: {e}")
             print(f"   Your configuration may not persist!")
 
     def get_interfaces(self):
-        """Get available network interfaces"""
-        result = subprocess.run(['ip', 'link', 'show'], capture_output=True, text=True)
-        interfaces = []
-        for line in result.stdout.split('\n'):
-            if ':' in line and not line.startswith(' '):
-                interface = line.split(':')[1].strip()
-                if interface not in ['lo']:  # Exclude loopback
-                    interfaces.append(interface)
-        return interfaces
+        """
+        Get available network interfaces.
 
-    def validate_ip(self, ip):
-        """Validate IP address format"""
-        parts = ip.split('.')
-        if len(parts) != 4:
-            return False
+        Lists /sys/class/net directly instead of forking 'ip link show'
+        (which is only used when sysfs can't be read). Non-directory
+        entries (e.g. bonding_masters) are skipped.
+        Not cached: interfaces can appear or go away during a session
+        (USB NIC, VLAN, veth, ...) and one scandir is cheap.
+        """
         try:
-            return all(0 <= int(part) <= 255 for part in parts)
-        except ValueError:
-            return False
+            with os.scandir(SYS_CLASS_NET) as entries:
+                names = [entry.name for entry in entries if entry.is_dir()]
+        except OSError:
+            # No sysfs (e.g. some containers): ask iproute2 instead
+            result = subprocess.run(['ip', 'link', 'show'], capture_output=True)
+            names = [name.decode() for name in _IP_LINK_RE.findall(result.stdout)]
+        return sorted(name for name in names if name != 'lo')  # Exclude loopback
+
+    def validate_ip(self, ip):
+        """Validate IP address format (dotted-quad IPv4)"""
+        return _IPV4_RE.fullmatch(ip) is not None
+
+    def invalid_ips(self, ips):
+        """Return the entries of ips that are not valid IPv4 addresses"""
+        return [ip for ip in ips if not self.validate_ip(ip)]
 
     def get_user_input(self):
         """Interactive user input for network configuration"""
@@ -116,48 +325,52 @@ class NetplanConfigurator:
             print("⚠ No network interfaces found")
             sys.exit(1)
 
-        print("\n🔌 Available interfaces:")
-        for i, iface in enumerate(interfaces, 1):
-            print(f"  {i}. {iface}")
+        sys.stdout.write("\n🔌 Available interfaces:\n" + "".join(
+            f"  {i}. {iface}\n" for i, iface in enumerate(interfaces, 1)
+        ))
 
-        # Select interface
-        while True:
+        # Each parser returns the value or raises ValueError(message)
+        def pick_interface(answer):
             try:
-                choice = int(input("\nSelect interface number: ")) - 1
-                if 0 <= choice < len(interfaces):
-                    interface = interfaces[choice]
-                    break
-                print("⚠ Invalid selection")
+                choice = int(answer) - 1
             except ValueError:
-                print("⚠ Please enter a number")
-
-        # Get IP address
-        while True:
-            ip_input = input("\nEnter static IP address (e.g., 192.168.1.100): ").strip()
-            if self.validate_ip(ip_input):
-                break
-            print("⚠ Invalid IP address format")
+                raise ValueError("⚠ Please enter a number")
+            if 0 <= choice < len(interfaces):
+                return interfaces[choice]
+            raise ValueError("⚠ Invalid selection")
 
-        # Get subnet mask
-        while True:
+        def parse_prefix(answer):
             try:
-                prefix = int(input("Enter subnet prefix (e.g., 24 for /24 or 255.255.255.0): "))
-                if 1 <= prefix <= 32:
-                    break
-                print("⚠ Prefix must be between 1 and 32")
+                prefix = int(answer)
             except ValueError:
-                print("⚠ Please enter a valid number")
-
-        # Get gateway
-        while True:
-            gateway = input("Enter gateway IP address (e.g., 192.168.1.1): ").strip()
-            if self.validate_ip(gateway):
-                break
-            print("⚠ Invalid gateway IP address")
-
-        # Get DNS servers
-        dns_input = input("\nEnter DNS servers (comma-separated, e.g., 8.8.8.8,8.8.4.4): ").strip()
-        dns_servers = [dns.strip() for dns in dns_input.split(',') if dns.strip()]
+                raise ValueError("⚠ Please enter a valid number")
+            if 1 <= prefix <= 32:
+                return prefix
+            raise ValueError("⚠ Prefix must be between 1 and 32")
+
+        def ip_parser(error):
+            def parse(answer):
+                answer = answer.strip()
+                if self.validate_ip(answer):
+                    return answer
+                raise ValueError(error)
+            return parse
+
+        def parse_dns(answer):
+            dns_servers = [dns.strip() for dns in answer.split(',') if dns.strip()]
+            invalid = self.invalid_ips(dns_servers)
+            if invalid:
+                raise ValueError(f"⚠ Invalid DNS server address: {', '.join(invalid)}")
+            return dns_servers
+
+        interface = _prompt("\nSelect interface number: ", pick_interface)
+        ip_input = _prompt("\nEnter static IP address (e.g., 192.168.1.100): ",
+                           ip_parser("⚠ Invalid IP address format"))
+        prefix = _prompt("Enter subnet prefix (e.g., 24 for /24 or 255.255.255.0): ", parse_prefix)
+        gateway = _prompt("Enter gateway IP address (e.g., 192.168.1.1): ",
+                          ip_parser("⚠ Invalid gateway IP address"))
+        dns_servers = _prompt("\nEnter DNS servers (comma-separated, e.g., 8.8.8.8,8.8.4.4): ",
+                              parse_dns)
 
         if not dns_servers:
             dns_servers = ['8.8.8.8', '8.8.4.4']
@@ -234,13 +447,12 @@ class NetplanConfigurator:
         """Apply netplan configuration"""
         print("\n⏳ Applying netplan configuration...")
         try:
-            result = subprocess.run(['netplan', 'apply'],
-                                    capture_output=True, text=True, timeout=10)
-            if result.returncode == 0:
+            returncode, stderr = run_quiet(['netplan', 'apply'], timeout=10)
+            if returncode == 0:
                 print("✓ Configuration applied successfully!")
                 return True
             else:
-                print(f"⚠ Error applying configuration: {result.stderr}")
+                print(f"⚠ Error applying configuration: {stderr}")
                 return False
         except subprocess.TimeoutExpired:
             print("⚠ Configuration application timed out")
@@ -249,12 +461,56 @@ class NetplanConfigurator:
             print(f"⚠ Error: {str(e)}")
             return False
 
-    def display_config(self, config):
-        """Display the configuration that will be applied"""
+    def apply_config_netlink(self, config_data):
+        """
+        Apply a static configuration directly over netlink (pyroute2)
+        instead of running 'netplan apply'.
+
+        Only the address and default route are set; DNS servers take effect
+        from the saved YAML on the next 'netplan apply' or reboot.
+        Falls back to apply_config() when pyroute2 is not installed.
+        """
+        try:
+            from pyroute2 import IPRoute
+        except ImportError:
+            print("ℹ pyroute2 not installed, using netplan apply instead")
+            return self.apply_config()
+
+        print("\n⏳ Applying configuration via netlink...")
+        ip, prefix = config_data['ip'].split('/')
+        try:
+            with IPRoute() as ipr:
+                links = ipr.link_lookup(ifname=config_data['interface'])
+                if not links:
+                    print(f"⚠ Interface {config_data['interface']} not found")
+                    return False
+                index = links[0]
+
+                # Replace any existing IPv4 addresses with the static one
+                ipr.flush_addr(index=index, family=socket.AF_INET)
+                ipr.addr('add', index=index, address=ip, prefixlen=int(prefix))
+                # Bound to this interface, as netplan does (on a multi-homed
+                # host the kernel could otherwise pick another NIC)
+                ipr.route('replace', dst='0.0.0.0/0', gateway=config_data['gateway'],
+                          oif=index)
+
+            print("✓ Configuration applied successfully!")
+            return True
+        except Exception as e:
+            print(f"⚠ Error: {str(e)}")
+            return False
+
+    def display_config(self, config, yaml_text=None):
+        """
+        Display the configuration that will be applied (as netplan YAML).
+        yaml_text is the output of render_config(config) if already known.
+        """
+        if yaml_text is None:
+            yaml_text = self.render_config(config)
         print("\n" + "=" * 50)
         print("📋 Configuration Preview:")
         print("=" * 50)
-        print(json.dumps(config, indent=4))
+        print(yaml_text)
 
     def run(self):
         """Main execution flow"""
@@ -266,8 +522,11 @@ class NetplanConfigurator:
         # Build configuration
         config = self.configure_static(config_data)
 
+        # Render once; the same text is previewed and saved
+        yaml_text = self.render_config(config)
+
         # Display preview
-        self.display_config(config)
+        self.display_config(config, yaml_text)
 
         # Confirm before applying
         confirm = input("\n⚠️  Apply this configuration? (yes/no): ").strip().lower()
@@ -276,7 +535,7 @@ class NetplanConfigurator:
             sys.exit(0)
 
         # ✅ Save configuration (now saves to BOTH JSON and YAML)
-        self.save_config(config)
+        self.save_config(config, yaml_text=yaml_text)
 
         # Apply configuration
         if self.apply_config():
@@ -285,4 +544,82 @@ class NetplanConfigurator:
             print(f"✓ Gateway: {config_data['gateway']}")
             print(f"✓ DNS: {', '.join(config_data['dns'])}")
         else:
-            print("⚠️  Configuration saved but failed to apply")
\ No newline at end of file
+            print("⚠️  Configuration saved but failed to apply")
+
+    def run_noninteractive(self, args):
+        """
+        Non-interactive version of run() for scripts.
+
+        args: argparse.Namespace with interface, ip, prefix, gateway,
+        dns (comma-separated string, may be empty) and optionally netlink
+        (use apply_config_netlink). Nothing is prompted; the configuration
+        is validated, saved and applied directly.
+        Returns True if the configuration was applied.
+        """
+        self.check_root()
+
+        if args.interface not in self.get_interfaces():
+            print(f"⚠ Unknown interface: {args.interface}")
+            return False
+        if not self.validate_ip(args.ip):
+            print("⚠ Invalid IP address format")
+            return False
+        if not 1 <= args.prefix <= 32:
+            print("⚠ Prefix must be between 1 and 32")
+            return False
+        if not self.validate_ip(args.gateway):
+            print("⚠ Invalid gateway IP address")
+            return False
+
+        dns_servers = [dns.strip() for dns in (args.dns or '').split(',') if dns.strip()]
+        invalid = self.invalid_ips(dns_servers)
+        if invalid:
+            print(f"⚠ Invalid DNS server address: {', '.join(invalid)}")
+            return False
+        if not dns_servers:
+            dns_servers = ['8.8.8.8', '8.8.4.4']
+
+        config_data = {
+            'interface': args.interface,
+            'ip': f"{args.ip}/{args.prefix}",
+            'gateway': args.gateway,
+            'dns': dns_servers
+        }
+
+        config = self.configure_static(config_data)
+        self.save_config(config)
+        if getattr(args, 'netlink', False):
+            return self.apply_config_netlink(config_data)
+        return self.apply_config()
+
+
+def build_arg_parser():
+    """Command-line options for running this module directly."""
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Configure a static IP with netplan. "
+                    "Without --interface the configuration is asked for interactively."
+    )
+    parser.add_argument('--interface', help="interface to configure, e.g. eth0")
+    parser.add_argument('--ip', help="static IPv4 address, e.g. 192.168.1.100")
+    parser.add_argument('--prefix', type=int, help="subnet prefix length, e.g. 24")
+    parser.add_argument('--gateway', help="gateway IPv4 address, e.g. 192.168.1.1")
+    parser.add_argument('--dns', default='', help="comma-separated DNS servers")
+    parser.add_argument('--netlink', action='store_true',
+                        help="apply address and route via netlink (pyroute2) "
+                             "instead of 'netplan apply'")
+    return parser
+
+
+if __name__ == "__main__":
+    parser = build_arg_parser()
+    args = parser.parse_args()
+    configurator = NetplanConfigurator()
+
+    if args.interface is None:
+        configurator.run()
+    else:
+        if args.ip is None or args.prefix is None or args.gateway is None:
+            parser.error("--interface requires --ip, --prefix and --gateway")
+        sys.exit(0 if configurator.run_noninteractive(args) else 1)
@@ -1,28 +1,65 @@
+import logging
+import sys
+
 import Network as nw
 from firewall import *
 import persistence as pst
-from ip_config import NetplanConfigurator
+from ip_config import NetplanConfigurator, strip_defaults
+
+
+# ==============================================================================
+# MENU TEXT (each menu is written with a single stdout write)
+# ==============================================================================
+
+_MAIN_MENU = (
+    "\n=== Main Menu ===\n"
+    "1. Alter Network Settings\n"
+    "2. Alter Firewall Settings\n"
+    "3. Exit\n"
+)
+
+_NET_MENU = (
+    "\n=== Network Settings ===\n"
+    "1. Show current network interfaces and IPs\n"
+    "2. Enable/Disable a network interface\n"
+    "3. Configure static IP for an interface\n"
+    "4. Set dynamic (DHCP) IP for an interface\n"
+    "5. Save Configurations\n"
+    "6. Back to Main Menu\n"
+)
+
+_FW_MENU = (
+    "\n=== Firewall Settings ===\n"
+    "1. Show current firewall rules\n"
+    "2. Add a new firewall rule\n"
+    "3. Delete a firewall rule\n"
+    "4. Save Configurations\n"
+    "5. Back to Main Menu\n"
+)
+
+_DELETE_MENU = (
+    "\nDelete rule by:\n"
+    "  1. Full specification (chain, protocol, port, action)\n"
+    "  2. Rule number (index in chain)\n"
+)
 
 
 # ==============================================================================
 # FIREWALL MENU FUNCTIONS
 # ==============================================================================
 
-def show_firewall_rules():
+def show_firewall_rules(fw):
     """
     Show current firewall rules for a chosen chain.
     """
-    fw = SimpleFirewall()
     chain = input("Chain to list (INPUT/OUTPUT/FORWARD): ").strip()
     fw.list_rules(chain)
 
 
-def add_firewall_rule():
+def add_firewall_rule(fw):
     """
     Add a firewall rule (interactive).
     """
-    fw = SimpleFirewall()
-
     chain = input("Chain (INPUT/OUTPUT/FORWARD): ").strip()
     protocol = input("Protocol (tcp/udp/icmp): ").strip()
 
@@ -35,15 +72,11 @@ def add_firewall_rule():
     fw.add_rule(chain, protocol, port, action)
 
 
-def delete_firewall_rule():
+def delete_firewall_rule(fw):
     """
     Delete a firewall rule.
     """
-    fw = SimpleFirewall()
-
-    print("\nDelete rule by:")
-    print("  1. Full specification (chain, protocol, port, action)")
-    print("  2. Rule number (index in chain)")
+    sys.stdout.write(_DELETE_MENU)
 
     choice = input("Choose option [1-2]: ").strip()
 
@@ -76,15 +109,14 @@ def delete_firewall_rule():
 # NETWORK IP CONFIGURATION FUNCTIONS
 # ==============================================================================
 
-def configure_static_ip(config_manager, nm, fw):
+def configure_static_ip(np, config_manager, nm, fw):
     """
     Handler for: 3. Configure static IP for an interface
 
     🔧 CHANGE: Added config_manager, nm, fw parameters
     WHY: So we can auto-save after configuration
+    np is the session's NetplanConfigurator (root already checked in main)
     """
-    np = NetplanConfigurator()
-    np.check_root()
 
     # Collect config data interactively (interface, IP, gateway, DNS, ...)
     config_data = np.get_user_input()
@@ -92,8 +124,11 @@ def configure_static_ip(config_manager, nm, fw):
     # Build full netplan configuration (static)
     config = np.configure_static(config_data)
 
+    # Render once; the same text is previewed and saved
+    yaml_text = np.render_config(config)
+
     # Show preview
-    np.display_config(config)
+    np.display_config(config, yaml_text)
 
     # Confirm and apply
     confirm = input("\nApply this STATIC IP configuration? (yes/no): ").strip().lower()
@@ -102,7 +137,7 @@ def configure_static_ip(config_manager, nm, fw):
         return
 
     # Apply the configuration
-    np.save_config(config)
+    np.save_config(config, yaml_text=yaml_text)
     if np.apply_config():
         print("\n✓ Static IP configuration completed!")
         print(f"   Interface: {config_data['interface']}")
@@ -114,7 +149,7 @@ def configure_static_ip(config_manager, nm, fw):
         # 🆕 NEW: Auto-save after successful configuration
         # =====================================================================
         print("\n💾 Auto-saving configuration...")
-        save_current_configuration(config_manager, nm, fw)
+        save_current_configuration(config_manager, nm, fw, np)
         # WHY: User just changed IP settings, we should save it automatically
         # so it persists after reboot
         # =====================================================================
@@ -122,15 +157,14 @@ def configure_static_ip(config_manager, nm, fw):
         print("⚠️ Configuration saved but failed to apply")
 
 
-def configure_dhcp_ip(config_manager, nm, fw):
+def configure_dhcp_ip(np, config_manager, nm, fw):
     """
     Handler for: 4. Set dynamic (DHCP) IP for an interface
 
     🔧 CHANGE: Added config_manager, nm, fw parameters
     WHY: So we can auto-save after configuration
+    np is the session's NetplanConfigurator (root already checked in main)
     """
-    np = NetplanConfigurator()
-    np.check_root()
 
     # Get available interfaces
     interfaces = np.get_interfaces()
@@ -138,9 +172,9 @@ def configure_dhcp_ip(config_manager, nm, fw):
         print("❌ No network interfaces found")
         return
 
-    print("\nAvailable interfaces:")
-    for i, iface in enumerate(interfaces, 1):
-        print(f"  {i}. {iface}")
+    sys.stdout.write("\nAvailable interfaces:\n" + "".join(
+        f"  {i}. {iface}\n" for i, iface in enumerate(interfaces, 1)
+    ))
 
     # Select interface
     while True:
@@ -156,8 +190,11 @@ def configure_dhcp_ip(config_manager, nm, fw):
     # Build full netplan configuration for DHCP
     config = np.configure_dhcp(interface)
 
+    # Render once; the same text is previewed and saved
+    yaml_text = np.render_config(config)
+
     # Show preview
-    np.display_config(config)
+    np.display_config(config, yaml_text)
 
     # Confirm and apply
     confirm = input("\nApply this DHCP configuration? (yes/no): ").strip().lower()
@@ -166,7 +203,7 @@ def configure_dhcp_ip(config_manager, nm, fw):
         return
 
     # Apply the configuration
-    np.save_config(config)
+    np.save_config(config, yaml_text=yaml_text)
     if np.apply_config():
         print(f"\n✓ DHCP enabled on interface: {interface}")
 
@@ -178,7 +215,7 @@ def configure_dhcp_ip(config_manager, nm, fw):
         time.sleep(3)  # Give DHCP client time to get IP
 
         print("💾 Auto-saving configuration...")
-        save_current_configuration(config_manager, nm, fw)
+        save_current_configuration(config_manager, nm, fw, np)
         # WHY: User just changed to DHCP, we should save it so it persists
         # =====================================================================
     else:
@@ -189,17 +226,20 @@ def configure_dhcp_ip(config_manager, nm, fw):
 # 🆕 PERSISTENCE HELPER FUNCTIONS (NEW!)
 # ==============================================================================
 
-def capture_current_network_state(nm, fw):
+def capture_current_network_state(nm, fw, np=None):
     """
     Capture current network and firewall state for saving.
 
     This captures:
     1. Interface states (UP/DOWN, IPs) from NetworkManager
     2. Firewall rules from SimpleFirewall
-    3. The FULL netplan YAML configuration
+    3. The FULL netplan YAML configuration (via np, the session's
+       NetplanConfigurator, if given)
 
     Returns a dict ready to be saved by persistence.py
+    Progress lines are collected and written in one go at the end.
     """
+    msgs = []
     config = {
         'interfaces': {},
         'firewall_rules': [],
@@ -207,52 +247,62 @@ def capture_current_network_state(nm, fw):
     }
 
     # Step 1: Capture network interface states
+    # Stored as columns (persistence.CONFIG_VERSION 2.0): one list per field
     try:
-        all_interfaces = nm.get_interfaces()
-
-        for interface, state in all_interfaces.items():
-            config['interfaces'][interface] = {
-                'status': state['status'],
-                'ipv6': state['ipv6'],
-                'ipv4': state['ipv4'],
-                'mac': state['mac']
-            }
-
-        print(f"✓ Captured state for {len(config['interfaces'])} interface(s)")
+        names, statuses, v4s, v6s, macs = [], [], [], [], []
+        for interface, state in nm.get_interfaces().items():
+            names.append(interface)
+            statuses.append(state['status'])
+            v4s.append(state['ipv4'])
+            v6s.append(state['ipv6'])
+            macs.append(state['mac'])
+
+        config['interfaces'] = {
+            'names': names,
+            'status': statuses,
+            'ipv4': v4s,
+            'ipv6': v6s,
+            'mac': macs
+        }
+
+        msgs.append(f"✓ Captured state for {len(names)} interface(s)")
 
     except Exception as e:
-        print(f"⚠️  Warning: Could not capture interface state: {e}")
+        msgs.append(f"⚠️  Warning: Could not capture interface state: {e}")
 
     # STEP 2: Capture firewall rules
     try:
         rules = fw.get_all_rules()
         config['firewall_rules'] = rules
-        print(f"✓ Captured {len(rules)} firewall rule(s)")
+        msgs.append(f"✓ Captured {len(rules)} firewall rule(s)")
 
     except Exception as e:
-        print(f"⚠️  Warning: Could not capture firewall rules: {e}")
+        msgs.append(f"⚠️  Warning: Could not capture firewall rules: {e}")
 
 
     # Step 3: Capture full netplan configuration
     try:
-        from ip_config import NetplanConfigurator
-        np = NetplanConfigurator()
+        if np is None:
+            np = NetplanConfigurator()
 
         # Load the FULL netplan config (includes network, version, ethernets)
         netplan_config = np.load_config()
 
         # ✅ CRITICAL: Save the ENTIRE config, not just ethernets
+        # (minus keys at netplan's defaults, e.g. dhcp4: false; netplan
+        # reads the restored file the same without them)
+        netplan_config = strip_defaults(netplan_config)
         config['netplan_config'] = netplan_config
 
         # Show what we captured
         if 'network' in netplan_config and 'ethernets' in netplan_config['network']:
             num_ifaces = len(netplan_config['network']['ethernets'])
-            print(f"✓ Captured full netplan configuration ({num_ifaces} interface(s))")
+            msgs.append(f"✓ Captured full netplan configuration ({num_ifaces} interface(s))")
         else:
-            print(f"⚠️  Warning: Netplan config is empty or malformed")
+            msgs.append(f"⚠️  Warning: Netplan config is empty or malformed")
 
     except Exception as e:
-        print(f"⚠️  Warning: Could not capture netplan config: {e}")
+        msgs.append(f"⚠️  Warning: Could not capture netplan config: {e}")
         config['netplan_config'] = {'network': {'version': 2, 'ethernets': {}}}
 
     # WHY THIS MATTERS:
@@ -261,10 +311,11 @@ def capture_current_network_state(nm, fw):
     # - This way when we restore, we write back the exact same YAML structure
     # =========================================================================
 
+    sys.stdout.write("\n".join(msgs) + "\n")
     return config
 
 
-def save_current_configuration(config_manager, nm, fw):
+def save_current_configuration(config_manager, nm, fw, np=None):
     """
     Save current network configuration to disk.
     This is called when user selects "Save Configurations" from menu.
@@ -272,20 +323,42 @@ def save_current_configuration(config_manager, nm, fw):
     print("\n💾 Saving current configuration...")
 
     # ✅ Capture includes full netplan config now
-    current_config = capture_current_network_state(nm, fw)
+    current_config = capture_current_network_state(nm, fw, np)
 
-    # Save to disk
-    if config_manager.save_configuration(current_config):
-        print("✅ Configuration saved successfully!")
-        print("   Your settings will persist after reboot.")
-    else:
-        print("❌ Failed to save configuration.")
+    # Save to disk on a background thread; the menu comes back right away
+    # and report_background_save() prints the outcome on the next menu tick
+    config_manager.save_configuration_async(current_config)
+    print("💾 Writing configuration in the background...")
+
+
+def report_background_save(config_manager, wait=False):
+    """
+    Print the outcome of finished background saves, if any.
+    wait=True blocks until running saves are done (used before exiting).
+    """
+    for ok, messages in config_manager.poll_save(wait):
+        if ok:
+            messages += ["✅ Configuration saved successfully!",
+                         "   Your settings will persist after reboot."]
+        else:
+            messages.append("❌ Failed to save configuration.")
+        sys.stdout.write("\n" + "\n".join(messages) + "\n")
+
+
+def changed_sections(saved_config, current_config):
+    """Names of the saved sections that differ from the current state."""
+    return [
+        section for section in ('interfaces', 'firewall_rules', 'netplan_config')
+        if section in saved_config
+        and saved_config[section] != current_config.get(section)
+    ]
 
 
-def restore_saved_configuration(config_manager, nm, fw):
+def restore_saved_configuration(config_manager, nm, fw, np=None):
     """
     Load and apply previously saved configuration.
     Called automatically when the program starts.
+    Nothing is asked or applied if the system already matches it.
     """
     print("\n🔄 Checking for saved configuration...")
 
@@ -296,19 +369,30 @@ def restore_saved_configuration(config_manager, nm, fw):
         print("ℹ️  No previous configuration found (this is normal for first run)")
         return False
 
-    # Show user what was saved
-    print(f"✅ Found saved configuration from: {saved_config.get('timestamp', 'unknown time')}")
-    print("\nSaved configuration contains:")
-    print(f"  - {len(saved_config.get('interfaces', {}))} network interface(s)")
-    print(f"  - {len(saved_config.get('firewall_rules', []))} firewall rule(s)")
+    # Show user what was saved (one write for the whole summary)
+    msgs = [
+        f"✅ Found saved configuration from: {saved_config.get('timestamp', 'unknown time')}",
+        "\nSaved configuration contains:",
+        f"  - {pst.interface_count(saved_config.get('interfaces', {}))} network interface(s)",
+        f"  - {len(saved_config.get('firewall_rules', []))} firewall rule(s)",
+    ]
 
     # Check if netplan config exists
     if 'netplan_config' in saved_config:
         if 'network' in saved_config['netplan_config']:
             ethernets = saved_config['netplan_config'].get('network', {}).get('ethernets', {})
-            print(f"  - Netplan configuration for {len(ethernets)} interface(s)")
+            msgs.append(f"  - Netplan configuration for {len(ethernets)} interface(s)")
     else:
-        print(f"  ⚠️  No netplan configuration found (may not restore IP settings)")
+        msgs.append(f"  ⚠️  No netplan configuration found (may not restore IP settings)")
+
+    # Already in the saved state? Then there is nothing to restore
+    msgs.append("\nComparing with the current system state...")
+    sys.stdout.write("\n".join(msgs) + "\n")
+    changed = changed_sections(saved_config, capture_current_network_state(nm, fw, np))
+    if not changed:
+        print("✅ Current system already matches the saved configuration, nothing to restore")
+        return False
+    print(f"  Differs in: {', '.join(changed)}")
 
     # Ask user if they want to restore
     restore = input("\nRestore this configuration? (yes/no): ").strip().lower()
@@ -328,129 +412,124 @@ def restore_saved_configuration(config_manager, nm, fw):
         return False
 
 
+# ==============================================================================
+# MENU INPUT HELPERS
+# ==============================================================================
+
+def read_choice(prompt):
+    """
+    Read a numeric menu choice. Returns None (after telling the user)
+    if the input is not a number.
+    """
+    try:
+        return int(input(prompt).strip())
+    except ValueError:
+        print("❌ Please enter a valid number.")
+        return None
+
+
+def toggle_interfaces(nm):
+    """
+    Handler for: 2. Enable/Disable a network interface
+    Several comma-separated interfaces are toggled concurrently.
+    """
+    print("Available interfaces:", ", ".join(nm.get_interface_names()))
+    ifaces = input("Please enter the interface(s), comma-separated: ").replace(',', ' ').split()
+    option = input("Enter 'e' to enable or 'd' to disable: ").strip().lower()
+
+    if option not in ("e", "d"):
+        print("❌ Please enter a valid option (e or d)")
+    elif len(ifaces) == 1:
+        result = nm.enable(ifaces[0]) if option == "e" else nm.disable(ifaces[0])
+        print(result)
+    elif ifaces:
+        # Several interfaces: toggle them concurrently
+        for iface, result in nm.set_many(ifaces, up=(option == "e")).items():
+            print(f"{iface}: {result}")
+    else:
+        print("❌ Please enter at least one interface")
+
+
 # ==============================================================================
 # MAIN PROGRAM
 # ==============================================================================
 
 def main():
+    # --verbose: show what a restore did per rule / per interface (logged
+    # by persistence at INFO level, hidden otherwise)
+    if '--verbose' in sys.argv[1:] or '-v' in sys.argv[1:]:
+        logging.basicConfig(level=logging.INFO, format="  ✓ %(message)s")
+
+    # One configurator for the whole session, so its caches are reused
+    np = NetplanConfigurator()
+    np.check_root()
+
     config_manager = pst.NetworkConfigManager()
     nm = nw.NetworkManager()
     fw = SimpleFirewall()
-    restore_saved_configuration(config_manager, nm, fw)
+    restore_saved_configuration(config_manager, nm, fw, np)
+
+    # =========================================================================
+    # Menu dispatch tables: {choice: handler}
+    # =========================================================================
+    net_actions = {
+        1: nm.show_interfaces,                                       # Show current interfaces
+        2: lambda: toggle_interfaces(nm),                            # Enable/Disable interface
+        3: lambda: configure_static_ip(np, config_manager, nm, fw),
+        4: lambda: configure_dhcp_ip(np, config_manager, nm, fw),
+        5: lambda: save_current_configuration(config_manager, nm, fw, np),
+        6: lambda: None,                                             # Back to main menu
+    }
+    fw_actions = {
+        1: lambda: show_firewall_rules(fw),
+        2: lambda: add_firewall_rule(fw),
+        3: lambda: delete_firewall_rule(fw),
+        4: lambda: save_current_configuration(config_manager, nm, fw, np),
+        5: lambda: None,                                             # Back to main menu
+    }
+    # main choice -> (menu text, prompt, actions, invalid-choice message)
+    submenus = {
+        1: (_NET_MENU, "Choose option [1-6]: ", net_actions,
+            "❌ Invalid option in Network Settings."),
+        2: (_FW_MENU, "Choose option [1-5]: ", fw_actions,
+            "❌ Invalid option in Firewall Settings."),
+    }
 
     # =========================================================================
     # Main menu loop
     # =========================================================================
     while True:
-        print("\n=== Main Menu ===")
-        print("1. Alter Network Settings")
-        print("2. Alter Firewall Settings")
-        print("3. Exit")
+        report_background_save(config_manager)
+        sys.stdout.write(_MAIN_MENU)
 
-        try:
-            main_choice = int(input("Choose option [1-3]: ").strip())
-        except ValueError:
-            print("❌ Please enter a valid number.")
+        main_choice = read_choice("Choose option [1-3]: ")
+        if main_choice is None:
             continue
 
-        # =====================================================================
-        # NETWORK SETTINGS SUBMENU
-        # =====================================================================
-        if main_choice == 1:
-            print("\n=== Network Settings ===")
-            print("1. Show current network interfaces and IPs")
-            print("2. Enable/Disable a network interface")
-            print("3. Configure static IP for an interface")
-            print("4. Set dynamic (DHCP) IP for an interface")
-            print("5. Save Configurations")
-            print("6. Back to Main Menu")
-
-            try:
-                net_choice = int(input("Choose option [1-6]: ").strip())
-            except ValueError:
-                print("❌ Please enter a valid number.")
-                continue
-
-            if net_choice == 1:
-                # Show current interfaces
-                nm.show_interfaces()
-
-            elif net_choice == 2:
-                # Enable/Disable interface
-                print("Available interfaces:", ", ".join(nm.get_interface_names()))
-                iface = input("Please enter the interface: ").strip()
-                option = input("Enter 'e' to enable or 'd' to disable: ").strip().lower()
-
-                if option == "e":
-                    result = nm.enable(iface)
-                    print(result)
-                elif option == "d":
-                    result = nm.disable(iface)
-                    print(result)
-                else:
-                    print("❌ Please enter a valid option (e or d)")
-
-            elif net_choice == 3:
-                configure_static_ip(config_manager, nm, fw)
-            elif net_choice == 4:
-                configure_dhcp_ip(config_manager, nm, fw)
-
-            elif net_choice == 5:
-                save_current_configuration(config_manager, nm, fw)
-
-            elif net_choice == 6:
-                # Back to main menu
-                continue
-            else:
-                print("❌ Invalid option in Network Settings.")
-
-        # =====================================================================
-        # FIREWALL SETTINGS SUBMENU
-        # =====================================================================
-        elif main_choice == 2:
-            print("\n=== Firewall Settings ===")
-            print("1. Show current firewall rules")
-            print("2. Add a new firewall rule")
-            print("3. Delete a firewall rule")
-            print("4. Save Configurations")
-            print("5. Back to Main Menu")
-
-            try:
-                fw_choice = int(input("Choose option [1-5]: ").strip())
-            except ValueError:
-                print("❌ Please enter a valid number.")
-                continue
-
-            if fw_choice == 1:
-                # Show firewall rules
-                show_firewall_rules()
-
-            elif fw_choice == 2:
-                # Add firewall rule
-                add_firewall_rule()
-
-            elif fw_choice == 3:
-                # Delete firewall rule
-                delete_firewall_rule()
-
-            elif fw_choice == 4:
-                save_current_configuration(config_manager, nm, fw)
-
-            elif fw_choice == 5:
-                # Back to main menu
-                continue
-            else:
-                print("❌ Invalid option in Firewall Settings.")
-
-        # =====================================================================
-        # EXIT
-        # =====================================================================
-        elif main_choice == 3:
+        if main_choice == 3:
+            # Don't exit with a save still being written
+            report_background_save(config_manager, wait=True)
             print("Exiting…")
             break
-        else:
+
+        submenu = submenus.get(main_choice)
+        if submenu is None:
             print("❌ Invalid main menu option.")
+            continue
+
+        menu_text, prompt, actions, invalid_msg = submenu
+        sys.stdout.write(menu_text)
+
+        choice = read_choice(prompt)
+        if choice is None:
+            continue
+
+        handler = actions.get(choice)
+        if handler is None:
+            print(invalid_msg)
+        else:
+            handler()
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
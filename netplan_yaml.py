@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+
+"""
+Fast YAML load/dump for the small netplan documents this tool writes.
+
+Netplan configs here are plain nested mappings/lists of strings, ints,
+bools and nulls. For that shape:
+- load() builds dicts/lists straight from libyaml's parse events,
+  skipping PyYAML's node composition and constructor chain
+- dump() emits the text directly instead of going through yaml.dump
+
+Anything outside that subset (anchors, tags, floats, dates, strings that
+need quoting, ...) falls back to PyYAML's (C)SafeLoader / (C)SafeDumper,
+so results always match what PyYAML would produce.
+"""
+
+import functools
+import re
+
+# Strings that can be written without quotes (still checked with the
+# YAML resolver, so '2', 'true', 'null', ... are not mistaken for str)
+_PLAIN_STR_RE = re.compile(r'[A-Za-z0-9_][A-Za-z0-9_./-]*')
+_INT_RE = re.compile(r'[-+]?(?:0|[1-9][0-9]*)')
+
+_BOOL_VALUES = {
+    'yes': True, 'Yes': True, 'YES': True,
+    'true': True, 'True': True, 'TRUE': True,
+    'on': True, 'On': True, 'ON': True,
+    'no': False, 'No': False, 'NO': False,
+    'false': False, 'False': False, 'FALSE': False,
+    'off': False, 'Off': False, 'OFF': False,
+}
+
+_resolver = None
+
+
+class _Unsupported(Exception):
+    """Input is outside the fast subset; use full PyYAML instead."""
+
+
+def safe_classes():
+    """
+    (Loader, Dumper): the libyaml-backed CSafeLoader / CSafeDumper when
+    PyYAML was built with libyaml, else the pure-Python SafeLoader /
+    SafeDumper. yaml is imported here, on first use.
+    """
+    try:
+        from yaml import CSafeLoader as Loader, CSafeDumper as Dumper
+    except ImportError:
+        from yaml import SafeLoader as Loader, SafeDumper as Dumper
+    return Loader, Dumper
+
+
+@functools.lru_cache(maxsize=256)
+def _resolve_tag(value):
+    """Tag PyYAML's resolver gives an untagged plain scalar."""
+    global _resolver
+    if _resolver is None:
+        from yaml.resolver import Resolver
+        _resolver = Resolver()
+    from yaml.nodes import ScalarNode
+    return _resolver.resolve(ScalarNode, value, (True, False))
+
+
+def _plain_scalar(value):
+    """Python value for a plain (unquoted, untagged) scalar."""
+    tag = _resolve_tag(value)
+    if tag == 'tag:yaml.org,2002:str':
+        return value
+    if tag == 'tag:yaml.org,2002:null':
+        return None
+    if tag == 'tag:yaml.org,2002:bool':
+        return _BOOL_VALUES[value]
+    if tag == 'tag:yaml.org,2002:int' and _INT_RE.fullmatch(value):
+        return int(value)
+    # floats, octal/hex ints, timestamps, ...
+    raise _Unsupported(value)
+
+
+def _load_events(events):
+    from yaml import events as ev
+
+    root = None
+    stack = []      # open containers
+    keys = []       # pending key per open container (no_key when none)
+    no_key = object()
+
+    def add(value):
+        nonlocal root
+        if not stack:
+            root = value
+            return
+        top = stack[-1]
+        if isinstance(top, list):
+            top.append(value)
+        elif keys[-1] is no_key:
+            if isinstance(value, (dict, list)):
+                raise _Unsupported("complex mapping key")
+            keys[-1] = value
+        else:
+            top[keys[-1]] = value
+            keys[-1] = no_key
+
+    for event in events:
+        if isinstance(event, ev.ScalarEvent):
+            if event.anchor is not None:
+                raise _Unsupported("anchor")
+            if event.implicit[0]:
+                add(_plain_scalar(event.value))
+            elif event.implicit[1]:
+                add(event.value)        # quoted scalar: always a str
+            else:
+                raise _Unsupported("explicit tag")
+        elif isinstance(event, ev.MappingStartEvent):
+            if event.anchor is not None or not event.implicit:
+                raise _Unsupported("anchor/tag on mapping")
+            stack.append({})
+            keys.append(no_key)
+        elif isinstance(event, ev.SequenceStartEvent):
+            if event.anchor is not None or not event.implicit:
+                raise _Unsupported("anchor/tag on sequence")
+            stack.append([])
+            keys.append(no_key)
+        elif isinstance(event, (ev.MappingEndEvent, ev.SequenceEndEvent)):
+            keys.pop()
+            add(stack.pop())
+        elif isinstance(event, ev.AliasEvent):
+            raise _Unsupported("alias")
+        elif isinstance(event, ev.DocumentStartEvent) and root is not None:
+            raise _Unsupported("multiple documents")
+
+    return root
+
+
+def load(text):
+    """Parse netplan YAML text into plain Python objects."""
+    import yaml
+    Loader, _ = safe_classes()
+
+    try:
+        return _load_events(yaml.parse(text, Loader=Loader))
+    except _Unsupported:
+        return yaml.load(text, Loader=Loader)
+
+
+def _scalar(value):
+    if value is True:
+        return 'true'
+    if value is False:
+        return 'false'
+    if value is None:
+        return 'null'
+    if type(value) is int:
+        return str(value)
+    if (type(value) is str and _PLAIN_STR_RE.fullmatch(value)
+            and _resolve_tag(value) == 'tag:yaml.org,2002:str'):
+        return value
+    raise _Unsupported(value)
+
+
+def _emit_mapping(mapping, indent, out):
+    pad = ' ' * indent
+    for key, value in mapping.items():
+        key = _scalar(key)
+        if isinstance(value, dict):
+            if value:
+                out.append(f"{pad}{key}:\n")
+                _emit_mapping(value, indent + 2, out)
+            else:
+                out.append(f"{pad}{key}: {{}}\n")
+        elif isinstance(value, list):
+            if value:
+                # Same layout as yaml.dump: list items are not indented
+                # further than their parent key
+                out.append(f"{pad}{key}:\n")
+                _emit_sequence(value, indent, out)
+            else:
+                out.append(f"{pad}{key}: []\n")
+        else:
+            out.append(f"{pad}{key}: {_scalar(value)}\n")
+
+
+def _emit_sequence(items, indent, out):
+    pad = ' ' * indent
+    for item in items:
+        if isinstance(item, dict) and item:
+            # First key shares the '- ' line, the rest line up beneath it
+            first = []
+            _emit_mapping(item, indent + 2, first)
+            first[0] = f"{pad}- {first[0][indent + 2:]}"
+            out.extend(first)
+        elif isinstance(item, (dict, list)):
+            raise _Unsupported("nested/empty collection in list")
+        else:
+            out.append(f"{pad}- {_scalar(item)}\n")
+
+
+def dump(config):
+    """
+    Render config as block-style YAML text (key order kept), identical
+    to yaml.dump(config, default_flow_style=False, sort_keys=False).
+    """
+    if isinstance(config, dict) and config:
+        out = []
+        try:
+            _emit_mapping(config, 0, out)
+            return ''.join(out)
+        except _Unsupported:
+            pass
+
+    import yaml
+    _, Dumper = safe_classes()
+    return yaml.dump(config, Dumper=Dumper, default_flow_style=False, sort_keys=False)
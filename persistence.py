@@ -1,12 +1,162 @@
 #!/usr/bin/env python3
 
 import json
+import logging
 import os
+import re
 import subprocess
-import yaml
-from datetime import datetime
 from pathlib import Path
 
+from ip_config import atomic_write, strip_defaults
+
+# Per-rule / per-interface restore details (the user sees summary lines)
+log = logging.getLogger(__name__)
+
+try:
+    import orjson  # optional: native JSON encoder/decoder
+except ImportError:
+    orjson = None
+
+
+def _dumps(obj):
+    """Indented JSON as bytes (orjson when available)."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+    return json.dumps(obj, indent=2).encode()
+
+
+def _loads(data):
+    """Parse JSON bytes (orjson when available)."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+# Layout version written by save_configuration. 2.0 stores 'interfaces'
+# as columns ({'names': [...], 'status': [...], ...}, one list per field,
+# so each key is written once); 1.0 files ({name: {field: value}}) are
+# converted on load.
+CONFIG_VERSION = "2.0"
+INTERFACE_FIELDS = ('status', 'ipv4', 'ipv6', 'mac')
+
+# Extra subprocess.run arguments for the tools spawned here. close_fds=False
+# skips the close-every-fd pass in the child: it is safe because Python
+# opens all fds non-inheritable (PEP 446), so the children only get the
+# stdin/stdout/stderr set up for them anyway.
+_SPAWN_KW = {'close_fds': False}
+
+# Default number of backups _create_backup keeps (newest first); older
+# ones are deleted
+BACKUP_KEEP = 20
+
+# Keys save_configuration adds (bookkeeping, or derived from other
+# sections like the pre-rendered netplan YAML); not part of the saved state
+_STAMP_KEYS = ('timestamp', 'version', 'config_hash', 'netplan_yaml')
+
+
+# ioctl request for a copy-on-write clone of a whole file (btrfs, xfs, ...)
+FICLONE = 0x40049409
+
+
+def _reflink(src, dst):
+    """
+    Make dst a copy-on-write clone of src (no data blocks copied) and
+    copy src's metadata over. Returns False, leaving no dst behind, if
+    the filesystem can't clone. An existing dst is never opened (it may
+    be a hardlink of src); False is returned and dst left as is.
+    """
+    import fcntl
+    import shutil
+
+    try:
+        fdst = open(dst, 'xb')
+    except OSError:
+        return False
+    try:
+        with open(src, 'rb') as fsrc, fdst:
+            fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+    except OSError:
+        try:
+            os.unlink(dst)
+        except OSError:
+            pass
+        return False
+    shutil.copystat(src, dst)
+    return True
+
+
+def iptables_script(rules):
+    """
+    Saved firewall rules as an iptables-restore script: one '-A ...' line
+    per rule (the arguments 'iptables' would get), grouped into one
+    '*table ... COMMIT' block per table. Rules without a 'table' key go
+    to the filter table.
+    """
+    # Build the rule specs (same arguments 'iptables' would get), by table.
+    # Each spec is one f-string: optional parts are '' when absent, so no
+    # per-rule argv list is built and joined.
+    tables = {}
+    for rule in rules:
+        get = rule.get
+        protocol = get('protocol')
+        port = get('port')
+        source = get('source')
+        spec = (
+            f"-A {get('chain', 'INPUT')}"                         # chain
+            f"{f' -p {protocol}' if protocol is not None else ''}"  # protocol
+            f"{f' --dport {port}' if port is not None else ''}"     # port
+            f"{f' -s {source}' if source is not None else ''}"      # source IP
+            f" -j {get('action', 'ACCEPT')}"                      # action
+        )
+        tables.setdefault(get('table', 'filter'), []).append(spec)
+
+    # iptables-save format, one block per table
+    return "".join(
+        f"*{table}\n" + "".join(f"{spec}\n" for spec in specs) + "COMMIT\n"
+        for table, specs in tables.items()
+    )
+
+
+def interface_columns(interfaces):
+    """{name: {field: value}} (1.0 layout) -> column layout."""
+    columns = {'names': list(interfaces)}
+    for field in INTERFACE_FIELDS:
+        columns[field] = [settings.get(field) for settings in interfaces.values()]
+    return columns
+
+
+def interface_rows(columns):
+    """
+    Column layout -> iterator of (name, {field: value}).
+    Missing values (no column, or None in it) are left out of the dict,
+    so settings.get(field, default) still falls back to the default.
+    """
+    names = columns.get('names', [])
+    fields = [columns.get(field) or [None] * len(names) for field in INTERFACE_FIELDS]
+    for name, *values in zip(names, *fields):
+        yield name, {field: value for field, value in zip(INTERFACE_FIELDS, values)
+                     if value is not None}
+
+
+def interface_count(columns):
+    """Number of interfaces in a column-layout 'interfaces' section."""
+    return len(columns.get('names', ()))
+
+
+def config_hash(config_data):
+    """
+    Hash of the saved state (bookkeeping keys left out), stable across
+    key order, so an unchanged configuration hashes the same every time.
+    """
+    import hashlib
+
+    state = {k: v for k, v in config_data.items() if k not in _STAMP_KEYS}
+    if orjson is not None:
+        data = orjson.dumps(state, option=orjson.OPT_SORT_KEYS)
+    else:
+        data = json.dumps(state, sort_keys=True, separators=(',', ':')).encode()
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
 
 class NetworkConfigManager:
     """
@@ -14,69 +164,176 @@ class NetworkConfigManager:
     Stores data in JSON format for easy reading and writing.
     """
 
-    def __init__(self, config_dir="/etc/network-tool"):
+    # config_dirs whose directories were already created in this process
+    _ensured = set()
+
+    def __init__(self, config_dir="/etc/network-tool", backup_keep=BACKUP_KEEP):
         self.config_dir = Path(config_dir)
         self.config_file = self.config_dir / "network_config.json"
         self.backup_dir = self.config_dir / "backups"
+        # Number of backups kept; older ones are pruned after each backup
+        self.backup_keep = backup_keep
+        # Firewall rules pre-compiled to iptables-restore format at save
+        # time, so a restore just replays the file
+        self.rules_file = self.config_dir / "iptables.rules"
 
         # ✅ FIX: Use the SAME netplan file path as ip_config2.py
         self.netplan_config_file = Path("/etc/netplan/01-netcfg.yaml")
         # WHY: This is the actual file that netplan reads from
 
+        # ((mtime_ns, size), config_hash) of config_file as last read or
+        # written here (None: not known yet). Other writers (ip_config's
+        # save_config) replace the file, which changes the key
+        self._saved_hash = None
+
+        # ((mtime_ns, size), raw bytes, parsed config or None) of the live
+        # netplan file, see _load_current_netplan
+        self._netplan_cache = None
+
+        # Background saves (save_configuration_async): one worker thread,
+        # created on first use, and the submitted saves not yet reported
+        self._save_executor = None
+        self._pending_saves = []
+
         self._ensure_directories()
 
     def _ensure_directories(self):
-        """Create configuration and backup directories if they don't exist."""
+        """
+        Create configuration and backup directories if they don't exist.
+        Done once per config_dir per process (see _ensured).
+        """
+        if self.config_dir in NetworkConfigManager._ensured:
+            return
         try:
             self.config_dir.mkdir(parents=True, exist_ok=True)
             self.backup_dir.mkdir(parents=True, exist_ok=True)
+            NetworkConfigManager._ensured.add(self.config_dir)
             print(f"✓ Configuration directory ready: {self.config_dir}")
         except PermissionError:
             print(f"✗ Error: Need root/sudo permission to create {self.config_dir}")
             raise
 
-    def save_configuration(self, config_data):
+    def save_configuration(self, config_data, say=print):
         """
         Save network configuration to a JSON file.
+        Nothing is written (no backup either) if the configuration is the
+        same as the one already saved.
+        Progress messages go to say() (print unless given).
         """
         try:
-            # Add timestamp
-            config_data['timestamp'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            config_data['version'] = "1.0"
+            digest = config_hash(config_data)
+            if digest == self._stored_hash():
+                say(f"✓ No changes since the last save, {self.config_file} left as is")
+                return True
+            config_data['config_hash'] = digest
+
+            from datetime import datetime  # only needed when writing
+
+            # Add timestamp (one clock read shared with the backup name);
+            # isoformat gives the same "YYYY-MM-DD HH:MM:SS" as strftime
+            now = datetime.now()
+            config_data['timestamp'] = now.isoformat(sep=' ', timespec='seconds')
+            config_data['version'] = CONFIG_VERSION
+
+            # Netplan section pre-rendered as the YAML file netplan reads,
+            # so a restore writes it out as is instead of dumping YAML
+            if 'netplan_config' in config_data:
+                import netplan_yaml
+                config_data['netplan_yaml'] = netplan_yaml.dump(config_data['netplan_config'])
 
             # Create backup of existing config
             if self.config_file.exists():
-                self._create_backup()
+                self._create_backup(now, say)
 
-            # Write configuration to file
-            with open(self.config_file, 'w') as f:
-                json.dump(config_data, f, indent=4)
+            # The old rules script no longer matches once the JSON changes
+            try:
+                self.rules_file.unlink()
+            except FileNotFoundError:
+                pass
+
+            # Write configuration to file (encoded in one go, one write).
+            # Written to a temp file and renamed over the old one, so a
+            # crash mid-save never leaves a truncated config behind.
+            # config_hash goes first in the file so peek_hash() can stop
+            # right after it
+            atomic_write(self.config_file, _dumps({'config_hash': digest, **config_data}))
+            st = self.config_file.stat()
+            self._saved_hash = ((st.st_mtime_ns, st.st_size), digest)
+
+            # Written after the JSON, so its mtime marks it as current
+            if 'firewall_rules' in config_data:
+                try:
+                    atomic_write(self.rules_file, iptables_script(config_data['firewall_rules']))
+                except OSError as e:
+                    say(f"⚠  Warning: Could not write {self.rules_file}: {e}")
 
-            print(f"✓ Configuration saved successfully to {self.config_file}")
+            say(f"✓ Configuration saved successfully to {self.config_file}")
 
             # Show what was saved
             if 'netplan_config' in config_data:
-                print(f"  ├─ Network interface settings saved")
+                say(f"  ├─ Network interface settings saved")
             if 'firewall_rules' in config_data:
-                print(f"  ├─ Firewall rules saved ({len(config_data['firewall_rules'])} rules)")
+                say(f"  ├─ Firewall rules saved ({len(config_data['firewall_rules'])} rules)")
             if 'interfaces' in config_data:
-                print(f"  └─ Interface states saved ({len(config_data['interfaces'])} interfaces)")
+                say(f"  └─ Interface states saved ({interface_count(config_data['interfaces'])} interfaces)")
 
             return True
 
         except Exception as e:
-            print(f"✗ Error saving configuration: {e}")
+            say(f"✗ Error saving configuration: {e}")
             return False
 
+    def save_configuration_async(self, config_data):
+        """
+        Run save_configuration(config_data) on a background thread and
+        return at once; collect the outcome later with poll_save().
+
+        Last write wins: a queued save that has not started yet is
+        dropped in favour of this newer one.
+        """
+        if self._save_executor is None:
+            from concurrent.futures import ThreadPoolExecutor
+            self._save_executor = ThreadPoolExecutor(max_workers=1)
+
+        # cancel() only succeeds for saves still waiting in the queue
+        self._pending_saves = [f for f in self._pending_saves if not f.cancel()]
+
+        def _save():
+            messages = []
+            ok = self.save_configuration(config_data, say=messages.append)
+            return ok, messages
+
+        self._pending_saves.append(self._save_executor.submit(_save))
+
+    def poll_save(self, wait=False):
+        """
+        Outcomes of finished background saves as a list of (ok, messages),
+        oldest first; saves still running are left for a later call
+        (wait=True blocks until all of them are done).
+        """
+        finished = [f for f in self._pending_saves if wait or f.done()]
+        self._pending_saves = [f for f in self._pending_saves if f not in finished]
+        return [f.result() for f in finished]
+
     def load_configuration(self):
         """Load network configuration from JSON file."""
         try:
-            if not self.config_file.exists():
+            # Just try the read: a separate exists() check costs a stat
+            # and can race with the file being removed
+            try:
+                with open(self.config_file, 'rb') as f:
+                    st = os.fstat(f.fileno())
+                    raw = f.read()
+            except FileNotFoundError:
                 print(f"ℹ No existing configuration found at {self.config_file}")
                 return None
 
-            with open(self.config_file, 'r') as f:
-                config_data = json.load(f)
+            config_data = _loads(raw)
+            self._saved_hash = ((st.st_mtime_ns, st.st_size), config_data.get('config_hash'))
+
+            # Files from before the column layout: convert 'interfaces'
+            if config_data.get('version', "1.0") == "1.0" and 'interfaces' in config_data:
+                config_data['interfaces'] = interface_columns(config_data['interfaces'])
 
             print(f"✓ Configuration loaded successfully from {self.config_file}")
             print(f"  Last saved: {config_data.get('timestamp', 'Unknown')}")
@@ -89,21 +346,108 @@ class NetworkConfigManager:
             print(f"✗ Error loading configuration: {e}")
             return None
 
-    def _create_backup(self):
-        """Create a backup of the current configuration file."""
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        backup_file = self.backup_dir / f"network_config_{timestamp}.json"
+    def _stored_hash(self):
+        """
+        config_hash recorded in config_file. Remembered until the file's
+        (mtime, size) changes, then read again.
+        """
+        try:
+            st = self.config_file.stat()
+        except OSError:
+            return None
+
+        key = (st.st_mtime_ns, st.st_size)
+        if self._saved_hash is None or self._saved_hash[0] != key:
+            try:
+                self._saved_hash = (key, self.peek_hash())
+            except Exception:
+                return None
+        return self._saved_hash[1]
 
+    def peek_hash(self):
+        """
+        Read just the config_hash from config_file.
+
+        With ijson installed the file is mmap'ed and parsed as a stream
+        that stops at the config_hash key (written first), so a large
+        netplan/rules section is never parsed; otherwise the whole file
+        is loaded.
+        """
         try:
-            import shutil
-            shutil.copy2(self.config_file, backup_file)
-            print(f"✓ Backup created: {backup_file}")
+            import ijson
+        except ImportError:
+            return _loads(self.config_file.read_bytes()).get('config_hash')
+
+        import mmap
+        with open(self.config_file, 'rb') as f, \
+                mmap.mmap(f.fileno(), 0, prot=mmap.PROT_READ) as mm:
+            for prefix, event, value in ijson.parse(mm):
+                if prefix == 'config_hash' and event == 'string':
+                    return value
+        return None
+
+    def _create_backup(self, now=None, say=print):
+        """
+        Create a backup of the current configuration file.
+        now is the save time (shared with the saved timestamp); the
+        current time is used if not given.
+        """
+        if now is None:
+            from datetime import datetime
+            now = datetime.now()
+
+        backup_file = self.backup_dir / f"network_config_{now:%Y%m%d_%H%M%S}.json"
+
+        import shutil
+
+        try:
+            # Hardlink: no data copied. Saves replace config_file with a new
+            # inode (atomic_write), so the link keeps the old contents.
+            try:
+                os.link(self.config_file, backup_file)
+            except FileExistsError:
+                # Two saves in one second. If the earlier one linked this
+                # very file, the backup already holds it; writing to it
+                # would truncate config_file too
+                if not os.path.samefile(self.config_file, backup_file):
+                    shutil.copy2(self.config_file, backup_file)
+            except OSError:
+                # e.g. backups on another filesystem
+                if not _reflink(self.config_file, backup_file):
+                    shutil.copy2(self.config_file, backup_file)
+            say(f"✓ Backup created: {backup_file}")
         except Exception as e:
-            print(f"⚠  Warning: Could not create backup: {e}")
+            say(f"⚠  Warning: Could not create backup: {e}")
+            return
+
+        self._prune_backups(self.backup_keep, say)
+
+    def _prune_backups(self, keep, say=print):
+        """Delete all but the `keep` most recent backups."""
+        try:
+            # One scandir pass; each DirEntry caches its own stat result
+            with os.scandir(self.backup_dir) as it:
+                backups = [e for e in it
+                           if e.name.startswith("network_config_") and e.name.endswith(".json")
+                           and e.is_file(follow_symlinks=False)]
+            if len(backups) <= keep:
+                return
+
+            backups.sort(key=lambda e: e.stat(follow_symlinks=False).st_mtime_ns, reverse=True)
+            for entry in backups[keep:]:
+                os.unlink(entry.path)
+            say(f"✓ Removed {len(backups) - keep} old backup(s)")
+        except OSError as e:
+            say(f"⚠  Warning: Could not prune old backups: {e}")
 
     def apply_network_configuration(self, config_data):
         """
         Apply loaded configuration to the system.
+
+        The firewall rules don't depend on the network settings, so
+        iptables-restore runs on a worker thread while netplan and the
+        interface states (which must stay in that order) are applied;
+        its messages are printed once it is done.
         """
         if not config_data:
             print("✗ No configuration data to apply")
@@ -111,12 +455,24 @@ class NetworkConfigManager:
 
         success = True
 
+        # Step 3 (started first): Apply firewall rules in the background
+        firewall = None
+        if config_data.get('firewall_rules'):
+            from concurrent.futures import ThreadPoolExecutor
+
+            firewall_msgs = []
+            pool = ThreadPoolExecutor(max_workers=1)
+            firewall = pool.submit(self._apply_firewall_rules,
+                                   config_data['firewall_rules'], firewall_msgs.append)
+            pool.shutdown(wait=False)
+
         # =====================================================================
         # STEP 1: Restore netplan YAML file FIRST
         # =====================================================================
         if 'netplan_config' in config_data:
             print("\n→ Restoring netplan configuration...")
-            if not self._restore_netplan_config(config_data['netplan_config']):
+            if not self._restore_netplan_config(config_data['netplan_config'],
+                                                config_data.get('netplan_yaml')):
                 print("  ⚠️  Warning: Could not restore netplan config")
                 success = False
         else:
@@ -124,31 +480,60 @@ class NetworkConfigManager:
         # Step 2: Apply interface states (up/down)
         if 'interfaces' in config_data:
             print("\n→ Applying network interface states...")
-            for interface, settings in config_data['interfaces'].items():
-                # Skip loopback
-                if interface == 'lo':
-                    continue
-
-                # Only handle up/down state, not IP addresses
-                # (IP addresses are handled by netplan)
-                if not self._apply_interface_state(interface, settings):
-                    success = False
+            if not self._apply_interface_states(config_data['interfaces']):
+                success = False
 
 
-        # Step 3: Apply firewall rules
-        if 'firewall_rules' in config_data:
+        # Step 3: Firewall rules (collect the background result)
+        if firewall is not None:
+            # An unexpected error in the worker must not abort the restore
+            # after the other steps already ran: report it like a failure
+            try:
+                ok = firewall.result()
+            except Exception as e:
+                firewall_msgs.append(f"  ✗ Error applying firewall rules: {e}")
+                ok = False
             print("\n→ Applying firewall rules...")
-            if not self._apply_firewall_rules(config_data['firewall_rules']):
+            if firewall_msgs:
+                print("\n".join(firewall_msgs))
+            if not ok:
                 success = False
 
         return success
 
-    def _restore_netplan_config(self, netplan_full_config):
+    def _restore_netplan_config(self, netplan_full_config, yaml_text=None):
+        """
+        Write netplan_full_config to the netplan file and apply it.
+        yaml_text is its YAML as rendered at save time (files saved
+        before that was stored have none; then it is rendered here).
+        """
+        # Same text as yaml.dump(default_flow_style=False, sort_keys=False),
+        # emitted directly, or via libyaml's CSafeDumper for anything the
+        # direct emitter doesn't cover; yaml is only imported if needed
+        import netplan_yaml
 
         try:
-            # Write the full config to netplan YAML file
-            with open(self.netplan_config_file, 'w') as f:
-                yaml.dump(netplan_full_config, f, default_flow_style=False, sort_keys=False)
+            # Live file already holds this config (saved snapshots have
+            # netplan defaults stripped, so compare the same way): skip
+            # the dump, the write and netplan apply
+            raw, current = self._load_current_netplan()
+            if isinstance(current, dict) and strip_defaults(current) == netplan_full_config:
+                print(f"  ✓ Netplan configuration unchanged, skipping netplan apply")
+                return True
+
+            if yaml_text is None:
+                yaml_text = netplan_yaml.dump(netplan_full_config)
+
+            # Same bytes already on disk: netplan would regenerate and
+            # restart the renderer for nothing, so skip write and apply
+            if raw is not None and raw == yaml_text.encode():
+                print(f"  ✓ Netplan configuration unchanged, skipping netplan apply")
+                return True
+
+            # Write the full config to netplan YAML file (atomically, so
+            # netplan never sees a half-written file)
+            atomic_write(self.netplan_config_file, yaml_text)
+            self._netplan_cache = None
 
             print(f"Netplan YAML restored to {self.netplan_config_file}")
 
@@ -156,9 +541,11 @@ class NetworkConfigManager:
             try:
                 result = subprocess.run(
                     ['netplan', 'apply'],
+                    stdin=subprocess.DEVNULL,
                     capture_output=True,
                     text=True,
-                    timeout=10
+                    timeout=10,
+                    **_SPAWN_KW
                 )
                 if result.returncode == 0:
                     print(f"  ✓ Netplan configuration applied")
@@ -174,60 +561,242 @@ class NetworkConfigManager:
             print(f"  ✗ Error restoring netplan config: {e}")
             return False
 
-    def _apply_interface_state(self, interface, settings):
+    def _load_current_netplan(self):
         """
-        Apply interface up/down state only.
-        IP addresses are managed by netplan, not here.
+        (raw bytes, parsed config) of the live netplan file, or (None, None)
+        if it can't be read; parsed is None if it isn't valid YAML.
+        Both are reused until the file's (mtime, size) changes.
         """
+        import netplan_yaml
+
         try:
-            status = settings.get('status', 'UP')
+            st = self.netplan_config_file.stat()
+        except OSError:
+            return None, None
 
-            if status == 'UP':
-                subprocess.run(['ip', 'link', 'set', interface, 'up'],
-                               capture_output=True)
-                print(f"  ✓ Interface {interface} enabled")
-            else:
-                subprocess.run(['ip', 'link', 'set', interface, 'down'],
-                               capture_output=True)
-                print(f"  ✓ Interface {interface} disabled")
+        key = (st.st_mtime_ns, st.st_size)
+        if self._netplan_cache is None or self._netplan_cache[0] != key:
+            try:
+                raw = self.netplan_config_file.read_bytes()
+            except OSError:
+                return None, None
+            try:
+                parsed = netplan_yaml.load(raw.decode())
+            except Exception:
+                parsed = None
+            self._netplan_cache = (key, raw, parsed)
 
-            return True
+        return self._netplan_cache[1], self._netplan_cache[2]
 
-        except subprocess.CalledProcessError as e:
-            print(f"  ✗ Error configuring {interface}: {e}")
-            return False
+    def _apply_interface_states(self, interfaces):
+        """
+        Apply up/down state for all saved interfaces (loopback skipped).
+        interfaces is the column-layout 'interfaces' section.
+
+        Uses one netlink socket (pyroute2) for every interface instead of
+        one 'ip link set' process each; without pyroute2 all of them go
+        through a single 'ip -batch' process instead.
+        """
+        # Skip loopback
+        # Only handle up/down state, not IP addresses
+        # (IP addresses are handled by netplan)
+        wanted = {name: settings for name, settings in interface_rows(interfaces) if name != 'lo'}
 
-    def _apply_firewall_rules(self, rules):
-        """Apply firewall rules using iptables."""
         try:
-            for rule in rules:
-                # Build iptables command from rule dictionary
-                cmd = ['iptables']
+            from pyroute2 import IPRoute
+        except ImportError:
+            return self._apply_interface_states_batch(wanted)
+
+        success = True
+        try:
+            with IPRoute() as ipr:
+                # One dump of all links: name -> index
+                indexes = {link.get_attr('IFLA_IFNAME'): link['index']
+                           for link in ipr.get_links()}
+
+                done = 0
+                for interface, settings in wanted.items():
+                    index = indexes.get(interface)
+                    if index is None:
+                        print(f"  ✗ Error configuring {interface}: no such interface")
+                        success = False
+                        continue
+
+                    # A failure on one interface (busy, EPERM, ...) must not
+                    # stop the rest from being restored
+                    up = settings.get('status', 'UP') == 'UP'
+                    try:
+                        ipr.link('set', index=index, state='up' if up else 'down')
+                    except Exception as e:
+                        print(f"  ✗ Error configuring {interface}: {e}")
+                        success = False
+                        continue
+                    log.info("interface %s %s", interface, 'enabled' if up else 'disabled')
+                    done += 1
+            print(f"  ✓ Set state of {done} interface(s)")
+        except Exception as e:
+            print(f"  ✗ Error configuring interfaces: {e}")
+            return False
 
-                # Add chain
-                cmd.extend(['-A', rule.get('chain', 'INPUT')])
+        return success
 
-                # Add protocol
-                if 'protocol' in rule:
-                    cmd.extend(['-p', rule['protocol']])
+    def _apply_interface_states_batch(self, wanted):
+        """
+        Apply up/down state with one 'ip -batch' process reading a
+        'link set <iface> up|down' line per interface from stdin.
+        IP addresses are managed by netplan, not here.
+        """
+        if not wanted:
+            return True
 
-                # Add port
-                if 'port' in rule:
-                    cmd.extend(['--dport', str(rule['port'])])
+        states = [(interface, settings.get('status', 'UP') == 'UP')
+                  for interface, settings in wanted.items()]
+        commands = "".join(f"link set {interface} {'up' if up else 'down'}\n"
+                           for interface, up in states)
 
-                # Add source IP
-                if 'source' in rule:
-                    cmd.extend(['-s', rule['source']])
+        try:
+            # -force: keep going after a failed line, report each one
+            result = subprocess.run(['ip', '-force', '-batch', '-'],
+                                    input=commands, capture_output=True, text=True,
+                                    **_SPAWN_KW)
+        except OSError as e:
+            print(f"  ✗ Error configuring interfaces: {e}")
+            return False
 
-                # Add action
-                cmd.extend(['-j', rule.get('action', 'ACCEPT')])
+        # Failed lines are reported as "Command failed -:<line number>"
+        failed = {int(n) for n in re.findall(r'Command failed -:(\d+)', result.stderr)}
+        if result.returncode != 0 and not failed:
+            print(f"  ✗ Error configuring interfaces: {result.stderr.strip()}")
+            return False
 
-                # Execute the command
-                subprocess.run(cmd, check=True, capture_output=True)
-                print(f"  ✓ Applied rule: {' '.join(cmd[1:])}")
+        for line, (interface, up) in enumerate(states, 1):
+            if line in failed:
+                print(f"  ✗ Error configuring {interface}")
+            else:
+                log.info("interface %s %s", interface, 'enabled' if up else 'disabled')
+        print(f"  ✓ Set state of {len(states) - len(failed)} interface(s)")
+        return not failed
 
+    def _apply_firewall_rules(self, rules, say=print):
+        """
+        Apply firewall rules using iptables (messages go to say()).
+
+        When rules_file is current (written with these rules at save
+        time) it is replayed as is: all rules go to the kernel in ONE
+        iptables-restore call instead of one iptables process per rule.
+        --noflush appends to the existing rules (same as 'iptables -A'),
+        and the whole batch is committed atomically: either every rule is
+        applied or none is.
+
+        Without a current script the rules are built and committed
+        in-process with python-iptables (see _apply_firewall_rules_iptc);
+        only if that is not installed is the script built here.
+        """
+        if not rules:
             return True
 
-        except subprocess.CalledProcessError as e:
-            print(f"  ✗ Error applying firewall rules: {e}")
-            return False
\ No newline at end of file
+        # Script compiled when these rules were saved
+        batch = self._cached_iptables_script()
+        if batch is None:
+            # Else in-process through python-iptables, or build it now
+            applied = self._apply_firewall_rules_iptc(rules, say)
+            if applied is not None:
+                return applied
+            batch = iptables_script(rules)
+
+        try:
+            result = subprocess.run(['iptables-restore', '--noflush'],
+                                    input=batch, capture_output=True, text=True,
+                                    **_SPAWN_KW)
+        except OSError as e:
+            say(f"  ✗ Error applying firewall rules: {e}")
+            return False
+
+        if result.returncode != 0:
+            say(f"  ✗ Error applying firewall rules: {result.stderr.strip()}")
+            return False
+
+        # Per-rule detail goes to the log, formatted only when INFO is
+        # enabled; the user gets one summary line
+        verbose = log.isEnabledFor(logging.INFO)
+        applied = 0
+        for spec in batch.splitlines():
+            if spec.startswith('-A '):
+                applied += 1
+                if verbose:
+                    log.info("applied rule: %s", spec)
+        say(f"  ✓ Applied {applied} firewall rule(s)")
+        return True
+
+    def _apply_firewall_rules_iptc(self, rules, say):
+        """
+        Apply firewall rules through python-iptables (libiptc): every rule
+        is appended with autocommit off and each table is committed to the
+        kernel once, so no iptables process is spawned at all.
+        Returns None if iptc is not installed (caller falls back to
+        iptables-restore), else True/False like _apply_firewall_rules.
+        """
+        try:
+            import iptc
+        except ImportError:
+            return None
+
+        tables = {}
+        try:
+            for spec in rules:
+                get = spec.get
+                name = get('table', 'filter')
+                table = tables.get(name)
+                if table is None:
+                    table = tables[name] = iptc.Table(name)
+                    table.autocommit = False
+
+                rule = iptc.Rule()
+                protocol = get('protocol')
+                port = get('port')
+                source = get('source')
+                if protocol is not None:
+                    rule.protocol = protocol
+                if port is not None:
+                    if protocol not in ('tcp', 'udp'):
+                        raise ValueError(f"--dport needs -p tcp or udp: {spec}")
+                    match = iptc.Match(rule, protocol)
+                    match.dport = str(port)
+                    rule.add_match(match)
+                if source is not None:
+                    rule.src = source
+                rule.target = iptc.Target(rule, get('action', 'ACCEPT'))
+                iptc.Chain(table, get('chain', 'INPUT')).append_rule(rule)
+
+            # One kernel update per table
+            for table in tables.values():
+                table.commit()
+        except (iptc.IPTCError, iptc.XTablesError, ValueError) as e:
+            # XTablesError: unknown target/match (e.g. a captured 'UNKNOWN'
+            # action or a user-chain jump)
+            say(f"  ✗ Error applying firewall rules: {e}")
+            return False
+        finally:
+            # Drop anything left uncommitted and hand the (shared) table
+            # objects back in their default mode
+            for table in tables.values():
+                table.autocommit = True
+                table.refresh()
+
+        if log.isEnabledFor(logging.INFO):
+            for spec in rules:
+                log.info("applied rule: %s", spec)
+        say(f"  ✓ Applied {len(rules)} firewall rule(s)")
+        return True
+
+    def _cached_iptables_script(self):
+        """
+        Contents of rules_file if it was written with (or after) the
+        current config_file, else None.
+        """
+        try:
+            if self.rules_file.stat().st_mtime_ns < self.config_file.stat().st_mtime_ns:
+                return None
+            return self.rules_file.read_text()
+        except OSError:
+            return None